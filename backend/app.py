@@ -4,19 +4,37 @@
 # Flask backend for partner creditworthiness assessment system using trained ML model
 # ========================================================================================
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
+from flask.json.provider import DefaultJSONProvider
 from werkzeug.exceptions import BadRequest
+import click
 import pandas as pd
 import numpy as np
 import sqlite3
 import json
+import math
 import io
+import glob
+import csv
+import zlib
+import base64
+import gzip
 import pickle
+import hashlib
 import joblib
 from datetime import datetime, timedelta
 import uuid
 import logging
+import threading
+import time
+import queue
+import atexit
+from collections import deque
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from typing import Optional, List, Dict, Any
 from typing import Dict, Any, List
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -24,6 +42,29 @@ from langchain.schema import HumanMessage
 import json
 import os
 
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet and Arrow batch files need pyarrow
+    pa = None
+    pq = None
+
+try:
+    import orjson
+except ImportError:  # Falls back to the standard json module
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack responses are unavailable
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # Only gzip is negotiated
+    brotli = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -45,6 +86,7 @@ class MLModelLoader:
         self.scaler = None
         self.encoder = None
         self.model_info = None
+        self.model_version = None
         self.load_models()
     
     def load_models(self):
@@ -70,6 +112,13 @@ class MLModelLoader:
                 self.model_info = json.load(f)
             logger.info("Model info loaded successfully")
             
+            # Version identifies the exact artifacts so stored results can be tied to them
+            digest = hashlib.sha256()
+            for artifact in ['best_nova_score_model.pkl', 'feature_scaler.pkl', 'partner_type_encoder.pkl', 'model_info.json']:
+                with open(artifact, 'rb') as f:
+                    digest.update(f.read())
+            self.model_version = f"{self.model_info['best_model_name']}-{digest.hexdigest()[:12]}"
+            
             logger.info(f"Using {self.model_info['best_model_name']} model with features: {len(self.model_info['feature_names'])}")
             
         except Exception as e:
@@ -88,11 +137,28 @@ except Exception as e:
 # DATABASE SETUP
 # ========================================================================================
 
+# Columns added to assessments after the original schema, as (name, type)
+ASSESSMENT_MIGRATION_COLUMNS = [
+    ('content_hash', 'TEXT'),
+    ('idempotency_key', 'TEXT'),
+    ('model_version', 'TEXT'),
+    ('recommendations', 'TEXT'),
+    ('partner_key', 'TEXT'),
+    ('payload_hash', 'TEXT')
+]
+
 def init_database():
     """Initialize SQLite database"""
     conn = sqlite3.connect('novascore.db')
     cursor = conn.cursor()
     
+    # Lets retention hand freed pages back to the filesystem a few at a time
+    # (takes effect on new databases; existing ones are converted by the first archive run)
+    cursor.execute('PRAGMA auto_vacuum=INCREMENTAL')
+    
+    # Long reads (exports, re-scoring) must not block request writes
+    cursor.execute('PRAGMA journal_mode=WAL')
+    
     # Create assessments table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS assessments (
@@ -110,10 +176,133 @@ def init_database():
             interest_rate REAL,
             risk_category TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            additional_data TEXT
+            additional_data TEXT,
+            content_hash TEXT,
+            idempotency_key TEXT,
+            model_version TEXT,
+            recommendations TEXT,
+            partner_key TEXT,
+            payload_hash TEXT
+        )
+    ''')
+    
+    # Add columns introduced after the original schema to existing databases
+    existing_columns = {row[1] for row in cursor.execute('PRAGMA table_info(assessments)')}
+    for column, column_type in ASSESSMENT_MIGRATION_COLUMNS:
+        if column not in existing_columns:
+            cursor.execute(f'ALTER TABLE assessments ADD COLUMN {column} {column_type}')
+    
+    # Model feature vectors, packed as little-endian float64 in FeatureStore layout order
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS assessment_features (
+            assessment_id TEXT PRIMARY KEY,
+            feature_layout TEXT NOT NULL,
+            features BLOB NOT NULL,
+            provided_mask INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    
+    # Feature names of every layout ever written, so vectors stay decodable after retraining
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS feature_layouts (
+            layout TEXT PRIMARY KEY,
+            feature_names TEXT NOT NULL
+        )
+    ''')
+    
+    # Drift monitoring sketches: periodic deltas per process, plus baselines
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS drift_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            sketch_layout TEXT NOT NULL,
+            vectors INTEGER NOT NULL,
+            state BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_drift_snapshots_kind ON drift_snapshots (kind, created_at)')
+    
+    # Latest assessment per partner, maintained by triggers on every insert and re-score
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS partner_latest (
+            partner_key TEXT PRIMARY KEY,
+            assessment_id TEXT NOT NULL,
+            nova_score REAL,
+            risk_category TEXT,
+            loan_approved BOOLEAN,
+            loan_amount INTEGER,
+            interest_rate REAL,
+            created_at TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_assessments_partner_latest_insert
+        AFTER INSERT ON assessments
+        WHEN NEW.partner_key IS NOT NULL
+        BEGIN
+            INSERT INTO partner_latest (partner_key, assessment_id, nova_score, risk_category,
+                                        loan_approved, loan_amount, interest_rate, created_at)
+            VALUES (NEW.partner_key, NEW.id, NEW.nova_score, NEW.risk_category,
+                    NEW.loan_approved, NEW.loan_amount, NEW.interest_rate, NEW.created_at)
+            ON CONFLICT (partner_key) DO UPDATE SET
+                assessment_id = excluded.assessment_id,
+                nova_score = excluded.nova_score,
+                risk_category = excluded.risk_category,
+                loan_approved = excluded.loan_approved,
+                loan_amount = excluded.loan_amount,
+                interest_rate = excluded.interest_rate,
+                created_at = excluded.created_at
+            WHERE excluded.created_at >= partner_latest.created_at;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_assessments_partner_latest_update
+        AFTER UPDATE OF nova_score, risk_category, loan_approved, loan_amount, interest_rate ON assessments
+        WHEN NEW.partner_key IS NOT NULL
+        BEGIN
+            UPDATE partner_latest
+            SET nova_score = NEW.nova_score,
+                risk_category = NEW.risk_category,
+                loan_approved = NEW.loan_approved,
+                loan_amount = NEW.loan_amount,
+                interest_rate = NEW.interest_rate
+            WHERE assessment_id = NEW.id;
+        END
+    ''')
+    
+    # Daily totals of assessments moved to the monthly archives, so dashboard statistics survive archival
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS assessment_rollups (
+            day DATE NOT NULL,
+            partner_type TEXT NOT NULL,
+            risk_category TEXT NOT NULL,
+            assessments INTEGER NOT NULL,
+            approved INTEGER NOT NULL,
+            nova_score_sum REAL NOT NULL,
+            PRIMARY KEY (day, partner_type, risk_category)
         )
     ''')
     
+    # Archive months holding each partner's assessments, so timelines only attach those
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS partner_archive_months (
+            partner_key TEXT NOT NULL,
+            month TEXT NOT NULL,
+            PRIMARY KEY (partner_key, month)
+        ) WITHOUT ROWID
+    ''')
+    
+    # Per-partner timelines
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_assessments_partner_key ON assessments (partner_key, created_at)')
+    
+    # Time-ordered scans (export)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_assessments_created_at ON assessments (created_at)')
+    
+    # Idempotency lookups
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_assessments_content_hash ON assessments (content_hash, created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_assessments_idempotency_key ON assessments (idempotency_key)')
+    
     conn.commit()
     conn.close()
 
@@ -125,6 +314,68 @@ init_database()
 # ========================================================================================
 
 class FeatureEngineer:
+    # Values used for features missing from the partner payload
+    DEFAULT_VALUES = {
+        'earning_consistency': 0.8,
+        'monthly_earning': 0,
+        'yearly_earning': 0,
+        'customer_rating': 5.0,
+        'active_days': 15,
+        'cancellation_rate': 0.05,
+        'complaint_rate': 0.03,
+        'working_tenure_ingrab': 6,
+        'total_trips': 0,
+        'vehicle_age': 3,
+        'trip_distance': 10,
+        'peak_hours_ratio': 0.3,
+        'total_orders': 0,
+        'avg_ordervalue': 200,
+        'preparation_time': 15,
+        'menu_diversity': 20,
+        'consumer_retention_rate': 0.7,
+        'total_deliveries': 0,
+        'avg_delivery_time': 25,
+        'delivery_success_rate': 0.95,
+        'batch_delivery_ratio': 0.2,
+        'partner_type_encoded': 0,
+        'earnings_per_active_day': 200,
+        'earning_consistency_ratio': 0.8,
+        'activity_per_tenure': 2.5,
+        'total_negative_rate': 0.08,
+        'rating_to_complaint_ratio': 100,
+        'trips_per_active_day': 8,
+        'earning_per_trip': 25,
+        'orders_per_active_day': 10,
+        'earning_per_order': 20,
+        'deliveries_per_active_day': 12,
+        'earning_per_delivery': 18
+    }
+
+    # Derived features computed for every partner
+    DERIVED_FEATURES = {
+        'earning_consistency', 'earnings_per_active_day', 'earning_consistency_ratio',
+        'activity_per_tenure', 'total_negative_rate', 'rating_to_complaint_ratio'
+    }
+
+    # Per partner type: (volume input, per-active-day feature, per-unit earning feature)
+    PARTNER_SPECIFIC_FEATURES = {
+        'driver': ('total_trips', 'trips_per_active_day', 'earning_per_trip'),
+        'merchant': ('total_orders', 'orders_per_active_day', 'earning_per_order'),
+        'delivery_partner': ('total_deliveries', 'deliveries_per_active_day', 'earning_per_delivery')
+    }
+
+    @staticmethod
+    def computed_rows(feature_name: str, partner_types: np.ndarray) -> np.ndarray:
+        """Rows whose feature_name is computed from other inputs rather than read or filled from DEFAULT_VALUES"""
+        if feature_name in FeatureEngineer.DERIVED_FEATURES:
+            return np.ones(len(partner_types), dtype=bool)
+        if feature_name == 'partner_type_encoded':
+            return np.isin(partner_types, ml_loader.encoder.classes_)
+        for partner_type, (_, per_day_name, per_unit_name) in FeatureEngineer.PARTNER_SPECIFIC_FEATURES.items():
+            if feature_name in (per_day_name, per_unit_name):
+                return partner_types == partner_type
+        return np.zeros(len(partner_types), dtype=bool)
+
     @staticmethod
     def calculate_derived_features(data: Dict[str, Any]) -> Dict[str, Any]:
         """Calculate derived features as per model training"""
@@ -198,104 +449,799 @@ class FeatureEngineer:
                 feature_vector.append(enriched_data[feature_name])
             else:
                 # Set default values for missing features
-                default_values = {
-                    'earning_consistency': 0.8,
-                    'monthly_earning': 0,
-                    'yearly_earning': 0,
-                    'customer_rating': 5.0,
-                    'active_days': 15,
-                    'cancellation_rate': 0.05,
-                    'complaint_rate': 0.03,
-                    'working_tenure_ingrab': 6,
-                    'total_trips': 0,
-                    'vehicle_age': 3,
-                    'trip_distance': 10,
-                    'peak_hours_ratio': 0.3,
-                    'total_orders': 0,
-                    'avg_ordervalue': 200,
-                    'preparation_time': 15,
-                    'menu_diversity': 20,
-                    'consumer_retention_rate': 0.7,
-                    'total_deliveries': 0,
-                    'avg_delivery_time': 25,
-                    'delivery_success_rate': 0.95,
-                    'batch_delivery_ratio': 0.2,
-                    'partner_type_encoded': 0,
-                    'earnings_per_active_day': 200,
-                    'earning_consistency_ratio': 0.8,
-                    'activity_per_tenure': 2.5,
-                    'total_negative_rate': 0.08,
-                    'rating_to_complaint_ratio': 100,
-                    'trips_per_active_day': 8,
-                    'earning_per_trip': 25,
-                    'orders_per_active_day': 10,
-                    'earning_per_order': 20,
-                    'deliveries_per_active_day': 12,
-                    'earning_per_delivery': 18
-                }
-                feature_vector.append(default_values.get(feature_name, 0))
-        
+                feature_vector.append(FeatureEngineer.DEFAULT_VALUES.get(feature_name, 0))
+
         return np.array(feature_vector).reshape(1, -1)
 
+    @staticmethod
+    def prepare_feature_matrix(df: pd.DataFrame, feature_names: List[str],
+                               missing_as_default: bool = False) -> np.ndarray:
+        """Column-wise equivalent of prepare_features_for_prediction for a DataFrame of partners
+
+        With missing_as_default, NaN cells are treated like keys absent from the payload
+        (useful for frames built from dicts with differing keys).
+        """
+        n_rows = len(df)
+
+        def column(name: str, default: float) -> np.ndarray:
+            if name in df.columns:
+                values = pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float)
+                if missing_as_default:
+                    values = np.where(np.isnan(values), default, values)
+                return values
+            return np.full(n_rows, default, dtype=float)
+
+        if 'partner_type' in df.columns:
+            partner_types = df['partner_type'].astype(object).to_numpy()
+        else:
+            partner_types = np.full(n_rows, 'driver', dtype=object)
+
+        # Same defaults and safe divisions as calculate_derived_features
+        monthly_earning = column('monthly_earning', 0)
+        yearly_earning = column('yearly_earning', 0)
+        active_days = np.maximum(column('active_days', 1), 1)
+        working_tenure_ingrab = np.maximum(column('working_tenure_ingrab', 1), 1)
+        cancellation_rate = column('cancellation_rate', 0)
+        complaint_rate = column('complaint_rate', 0)
+        customer_rating = column('customer_rating', 5.0)
+
+        expected_yearly = monthly_earning * 12
+        derived = {}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            derived['earning_consistency'] = np.where(
+                expected_yearly > 0, yearly_earning / np.maximum(expected_yearly, 1), 0
+            )
+            derived['earnings_per_active_day'] = monthly_earning / active_days
+            derived['earning_consistency_ratio'] = np.minimum(derived['earning_consistency'], 1.0)
+            derived['activity_per_tenure'] = active_days / working_tenure_ingrab
+            derived['total_negative_rate'] = cancellation_rate + complaint_rate
+            derived['rating_to_complaint_ratio'] = customer_rating / np.maximum(complaint_rate, 0.001)
+
+            # Partner-specific features only apply to rows of that type
+            for partner_type, (volume_name, per_day_name, per_unit_name) in FeatureEngineer.PARTNER_SPECIFIC_FEATURES.items():
+                mask = partner_types == partner_type
+                volume = column(volume_name, 0)
+                derived[per_day_name] = np.where(
+                    mask, volume / active_days,
+                    column(per_day_name, FeatureEngineer.DEFAULT_VALUES.get(per_day_name, 0))
+                )
+                derived[per_unit_name] = np.where(
+                    mask, monthly_earning / np.maximum(volume, 1),
+                    column(per_unit_name, FeatureEngineer.DEFAULT_VALUES.get(per_unit_name, 0))
+                )
+
+        # Encode each distinct partner type once
+        encoded = np.zeros(n_rows, dtype=float)
+        for partner_type in pd.unique(partner_types):
+            try:
+                code = ml_loader.encoder.transform([partner_type])[0]
+            except:
+                code = 0  # Default encoding
+            encoded[partner_types == partner_type] = code
+        derived['partner_type_encoded'] = encoded
+
+        columns = []
+        for feature_name in feature_names:
+            if feature_name in derived:
+                columns.append(derived[feature_name])
+            else:
+                columns.append(column(feature_name, FeatureEngineer.DEFAULT_VALUES.get(feature_name, 0)))
+
+        return np.column_stack(columns) if columns else np.empty((n_rows, 0))
+
 # ========================================================================================
 # VALIDATION FUNCTIONS
 # ========================================================================================
 
+# Range and type rules shared by every partner type (a max of None leaves the range open)
+COMMON_FIELD_RULES = {
+    'monthly_earning': {'label': 'Monthly earning', 'type': 'number', 'min': 0, 'max': None},
+    'yearly_earning': {'label': 'Yearly earning', 'type': 'number', 'min': 0, 'max': None},
+    'customer_rating': {'label': 'Customer rating', 'type': 'number', 'min': 1.0, 'max': 5.0},
+    'active_days': {'label': 'Active days', 'type': 'integer', 'min': 0, 'max': 31},
+    'working_tenure_ingrab': {'label': 'Working tenure', 'type': 'number', 'min': 0, 'max': None},
+    'cancellation_rate': {'label': 'Cancellation rate', 'type': 'number', 'min': 0.0, 'max': 1.0},
+    'complaint_rate': {'label': 'Complaint rate', 'type': 'number', 'min': 0.0, 'max': 1.0}
+}
+
+# Partner type definitions published by /api/partner-types and compiled into validation schemas
+PARTNER_TYPES = [
+    {
+        "id": "driver",
+        "name": "Driver",
+        "description": "Vehicle drivers for ride-sharing services",
+        "required_fields": ["total_trips", "vehicle_age", "trip_distance", "peak_hours_ratio"],
+        "field_rules": {
+            'total_trips': {'label': 'Total trips', 'type': 'integer', 'min': 0, 'max': None},
+            'vehicle_age': {'label': 'Vehicle age', 'type': 'number', 'min': 0, 'max': None},
+            'trip_distance': {'label': 'Trip distance', 'type': 'number', 'min': 0, 'max': None},
+            'peak_hours_ratio': {'label': 'Peak hours ratio', 'type': 'number', 'min': 0.0, 'max': 1.0}
+        }
+    },
+    {
+        "id": "merchant",
+        "name": "Merchant",
+        "description": "Restaurant and store partners",
+        "required_fields": ["total_orders", "avg_ordervalue", "preparation_time", "menu_diversity", "consumer_retention_rate"],
+        "field_rules": {
+            'total_orders': {'label': 'Total orders', 'type': 'integer', 'min': 0, 'max': None},
+            'avg_ordervalue': {'label': 'Average order value', 'type': 'number', 'min': 0, 'max': None},
+            'preparation_time': {'label': 'Preparation time', 'type': 'number', 'min': 0, 'max': None},
+            'menu_diversity': {'label': 'Menu diversity', 'type': 'integer', 'min': 0, 'max': None},
+            'consumer_retention_rate': {'label': 'Consumer retention rate', 'type': 'number', 'min': 0.0, 'max': 1.0}
+        }
+    },
+    {
+        "id": "delivery_partner",
+        "name": "Delivery Partner",
+        "description": "Food and package delivery partners",
+        "required_fields": ["total_deliveries", "avg_delivery_time", "delivery_success_rate", "batch_delivery_ratio"],
+        "field_rules": {
+            'total_deliveries': {'label': 'Total deliveries', 'type': 'integer', 'min': 0, 'max': None},
+            'avg_delivery_time': {'label': 'Average delivery time', 'type': 'number', 'min': 0, 'max': None},
+            'delivery_success_rate': {'label': 'Delivery success rate', 'type': 'number', 'min': 0.0, 'max': 1.0},
+            'batch_delivery_ratio': {'label': 'Batch delivery ratio', 'type': 'number', 'min': 0.0, 'max': 1.0}
+        }
+    }
+]
+
+# Rows in a batch upload cannot be scored without these
+BATCH_REQUIRED_FIELDS = ['monthly_earning', 'customer_rating']
+
+class PartnerSchema:
+    """Validation rules for one partner type, compiled once for dict and DataFrame checks"""
+
+    def __init__(self, field_rules: Dict[str, Dict[str, Any]]):
+        self.fields = [
+            (name, rule['type'], rule['min'], np.inf if rule['max'] is None else rule['max'],
+             PartnerSchema.rule_message(rule))
+            for name, rule in field_rules.items()
+        ]
+
+    @staticmethod
+    def rule_message(rule: Dict[str, Any]) -> str:
+        if rule['max'] is not None:
+            return f"{rule['label']} must be between {rule['min']} and {rule['max']}"
+        kind = 'a whole number' if rule['type'] == 'integer' else 'a number'
+        return f"{rule['label']} must be {kind} of at least {rule['min']}"
+
+    @staticmethod
+    def is_finite(value: Any) -> bool:
+        """math.isfinite that treats ints too large for a float as not finite"""
+        try:
+            return math.isfinite(value)
+        except OverflowError:
+            return False
+
+    def validate_record(self, data: Dict[str, Any]) -> List[str]:
+        """Return error messages for a single payload"""
+        errors = []
+        for name, kind, low, high, message in self.fields:
+            if name in data:
+                value = data[name]
+                allowed_types = int if kind == 'integer' else (int, float)
+                if isinstance(value, bool) or not isinstance(value, allowed_types) or \
+                        not PartnerSchema.is_finite(value) or not (low <= value <= high):
+                    errors.append(message)
+        return errors
+
+    def validate_frame(self, df: pd.DataFrame) -> np.ndarray:
+        """Return a rows x fields boolean matrix of failed checks; empty cells are treated as absent"""
+        failed = np.zeros((len(df), len(self.fields)), dtype=bool)
+        for j, (name, kind, low, high, _) in enumerate(self.fields):
+            if name in df.columns:
+                failed[:, j] = PartnerSchema.check_column(df[name], kind, low, high)
+        return failed
+
+    @staticmethod
+    def check_column(raw: pd.Series, kind: str, low: float, high: float) -> np.ndarray:
+        """Type and range mask for one column"""
+        values = pd.to_numeric(raw, errors='coerce').to_numpy(dtype=float)
+        present = raw.notna().to_numpy()
+        wrong_type = present & ~np.isfinite(values)
+        if kind == 'integer':
+            wrong_type |= present & ~np.isnan(values) & (values != np.floor(values))
+        with np.errstate(invalid='ignore'):
+            out_of_range = (values < low) | (values > high)
+        return wrong_type | (present & out_of_range)
+
+# Compiled once per partner type
+PARTNER_SCHEMAS = {
+    partner_type['id']: PartnerSchema({**COMMON_FIELD_RULES, **partner_type['field_rules']})
+    for partner_type in PARTNER_TYPES
+}
+
 def validate_partner_data(partner_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
     """Validate partner data based on type"""
-    errors = []
-    
-    # Common validations
-    if 'customer_rating' in data:
-        if not isinstance(data['customer_rating'], (int, float)) or not (1.0 <= data['customer_rating'] <= 5.0):
-            errors.append('Customer rating must be between 1.0 and 5.0')
-    
-    if 'active_days' in data:
-        if not isinstance(data['active_days'], int) or not (0 <= data['active_days'] <= 31):
-            errors.append('Active days must be between 0 and 31')
-    
-    # Partner-specific validations
-    if partner_type == 'driver':
-        if 'peak_hours_ratio' in data:
-            if not isinstance(data['peak_hours_ratio'], (int, float)) or not (0.0 <= data['peak_hours_ratio'] <= 1.0):
-                errors.append('Peak hours ratio must be between 0.0 and 1.0')
-                
-    elif partner_type == 'merchant':
-        if 'consumer_retention_rate' in data:
-            if not isinstance(data['consumer_retention_rate'], (int, float)) or not (0.0 <= data['consumer_retention_rate'] <= 1.0):
-                errors.append('Consumer retention rate must be between 0.0 and 1.0')
-                
-    elif partner_type == 'delivery_partner':
-        if 'delivery_success_rate' in data:
-            if not isinstance(data['delivery_success_rate'], (int, float)) or not (0.0 <= data['delivery_success_rate'] <= 1.0):
-                errors.append('Delivery success rate must be between 0.0 and 1.0')
-        if 'batch_delivery_ratio' in data:
-            if not isinstance(data['batch_delivery_ratio'], (int, float)) or not (0.0 <= data['batch_delivery_ratio'] <= 1.0):
-                errors.append('Batch delivery ratio must be between 0.0 and 1.0')
+    schema = PARTNER_SCHEMAS.get(partner_type, PartnerSchema(COMMON_FIELD_RULES))
+    errors = schema.validate_record(data)
     
     if errors:
         raise ValueError('; '.join(errors))
     
     return data
 
+def validate_partner_frame(df: pd.DataFrame) -> Dict[str, Any]:
+    """Validate a DataFrame chunk of partners column-wise
+
+    Returns a boolean `valid` mask aligned with the rows and `errors`, a list of
+    {'row_index', 'errors'} reports for the rejected rows only.
+    """
+    n_rows = len(df)
+    messages = []
+    failed_columns = []
+
+    # Required fields
+    for name in BATCH_REQUIRED_FIELDS:
+        missing = df[name].isna().to_numpy() if name in df.columns else np.ones(n_rows, dtype=bool)
+        messages.append(f'{name} is required')
+        failed_columns.append(missing)
+
+    # Partner type
+    if 'partner_type' in df.columns:
+        partner_types = df['partner_type'].astype(object).to_numpy()
+    else:
+        partner_types = np.full(n_rows, 'driver', dtype=object)
+    type_masks = {partner_type: partner_types == partner_type for partner_type in PARTNER_SCHEMAS}
+    messages.append('Invalid partner type. Must be driver, merchant, or delivery_partner')
+    failed_columns.append(~np.logical_or.reduce(list(type_masks.values())))
+
+    # Type-specific ranges; each distinct rule is checked once and applied to the types using it
+    rule_types = {}
+    for partner_type, schema in PARTNER_SCHEMAS.items():
+        for rule in schema.fields:
+            rule_types.setdefault(rule, []).append(partner_type)
+    for (name, kind, low, high, message), applies_to in rule_types.items():
+        messages.append(message)
+        if name in df.columns:
+            failed_columns.append(PartnerSchema.check_column(df[name], kind, low, high) &
+                                  np.logical_or.reduce([type_masks[t] for t in applies_to]))
+        else:
+            failed_columns.append(np.zeros(n_rows, dtype=bool))
+
+    failed = np.column_stack(failed_columns)
+    valid = ~failed.any(axis=1)
+
+    # Rejected rows share a handful of failure patterns; build each message list once
+    rejected = np.flatnonzero(~valid)
+    pattern_codes = failed[rejected].astype(np.int64) @ (np.int64(1) << np.arange(len(messages), dtype=np.int64))
+    patterns, pattern_ids = np.unique(pattern_codes, return_inverse=True)
+    pattern_messages = [[messages[j] for j in range(len(messages)) if code >> j & 1] for code in patterns.tolist()]
+    errors = [
+        {'row_index': row_index, 'errors': pattern_messages[pattern_id]}
+        for row_index, pattern_id in zip(rejected.tolist(), pattern_ids.tolist())
+    ]
+
+    return {'valid': valid, 'errors': errors}
+
 def validate_partner_type(partner_type: str) -> bool:
     """Validate partner type"""
-    return partner_type in ['driver', 'merchant', 'delivery_partner']
+    return partner_type in PARTNER_SCHEMAS
+
+# ========================================================================================
+# BATCH FILE FORMATS
+# ========================================================================================
+
+class UnsupportedFormatError(Exception):
+    """Raised for batch files in an unknown format, or one whose optional dependency is missing"""
+    pass
+
+class BatchFileFormat:
+    """Readers and writers for batch uploads and batch result downloads"""
+    
+    EXTENSIONS = {
+        '.csv': 'csv',
+        '.parquet': 'parquet',
+        '.pq': 'parquet',
+        '.arrow': 'arrow',
+        '.feather': 'arrow',
+        '.ipc': 'arrow',
+        '.ndjson': 'ndjson',
+        '.jsonl': 'ndjson'
+    }
+    CONTENT_TYPES = {
+        'text/csv': 'csv',
+        'application/vnd.apache.parquet': 'parquet',
+        'application/x-parquet': 'parquet',
+        'application/vnd.apache.arrow.file': 'arrow',
+        'application/vnd.apache.arrow.stream': 'arrow',
+        'application/x-ndjson': 'ndjson',
+        'application/jsonl': 'ndjson'
+    }
+    MIMETYPES = {
+        'csv': 'text/csv',
+        'parquet': 'application/vnd.apache.parquet',
+        'arrow': 'application/vnd.apache.arrow.file',
+        'ndjson': 'application/x-ndjson'
+    }
+    ARROW_FORMATS = {'parquet', 'arrow'}
+    
+    # Columnar and NDJSON uploads are projected to the fields scoring and validation read
+    INPUT_COLUMNS = (
+        set(ml_loader.model_info['feature_names']) | {'partner_type', 'partner_name', 'partner_key'} |
+        set(BATCH_REQUIRED_FIELDS) | {name for schema in PARTNER_SCHEMAS.values() for name, *_ in schema.fields}
+    )
+    # Identity columns are read as text so keys such as '007' keep their leading zeros
+    IDENTITY_COLUMNS = {'partner_key': str, 'partner_name': str}
+    
+    @staticmethod
+    def detect(filename: str, content_type: Optional[str]) -> Optional[str]:
+        """Format name from the file extension, falling back to the content type"""
+        extension = os.path.splitext((filename or '').lower())[1]
+        if extension in BatchFileFormat.EXTENSIONS:
+            return BatchFileFormat.EXTENSIONS[extension]
+        return BatchFileFormat.CONTENT_TYPES.get((content_type or '').split(';')[0].strip().lower())
+    
+    @staticmethod
+    def require(fmt: str):
+        if fmt not in BatchFileFormat.MIMETYPES:
+            raise UnsupportedFormatError(f"Unsupported format '{fmt}'. Use csv, parquet, arrow or ndjson")
+        if fmt in BatchFileFormat.ARROW_FORMATS and pa is None:
+            raise UnsupportedFormatError(f"{fmt} files require pyarrow to be installed")
+    
+    @staticmethod
+    def project(columns: List[str]) -> List[str]:
+        return [name for name in columns if name in BatchFileFormat.INPUT_COLUMNS]
+    
+    @staticmethod
+    def read(stream, fmt: str) -> pd.DataFrame:
+        """Read an uploaded batch file into a DataFrame"""
+        BatchFileFormat.require(fmt)
+        if fmt == 'csv':
+            return pd.read_csv(stream, dtype=BatchFileFormat.IDENTITY_COLUMNS)
+        if fmt == 'ndjson':
+            df = pd.read_json(stream, lines=True, convert_dates=False, dtype=BatchFileFormat.IDENTITY_COLUMNS)
+            return df[BatchFileFormat.project(list(df.columns))]
+        
+        buffer = pa.py_buffer(stream.read())
+        if fmt == 'parquet':
+            parquet_file = pq.ParquetFile(pa.BufferReader(buffer))
+            table = parquet_file.read(columns=BatchFileFormat.project(parquet_file.schema_arrow.names))
+        else:
+            # IPC file (Feather v2) or stream; both map the upload buffer without copying
+            try:
+                table = pa.ipc.open_file(buffer).read_all()
+            except pa.ArrowInvalid:
+                table = pa.ipc.open_stream(buffer).read_all()
+            table = table.select(BatchFileFormat.project(table.column_names))
+        
+        for name in BatchFileFormat.IDENTITY_COLUMNS:
+            if name in table.column_names and not pa.types.is_string(table.schema.field(name).type):
+                index = table.column_names.index(name)
+                table = table.set_column(index, name, table.column(name).cast(pa.string()))
+        
+        # Null-free numeric columns are handed to pandas without a copy
+        df = table.to_pandas(split_blocks=True)
+        for name in df.columns:
+            if isinstance(df[name].dtype, pd.CategoricalDtype):
+                df[name] = df[name].astype(object)
+        return df
+    
+    @staticmethod
+    def write(df: pd.DataFrame, fmt: str) -> io.BytesIO:
+        """Serialize a result table for download"""
+        BatchFileFormat.require(fmt)
+        if fmt == 'csv':
+            return io.BytesIO(df.to_csv(index=False).encode('utf-8'))
+        if fmt == 'ndjson':
+            return io.BytesIO(df.to_json(orient='records', lines=True).encode('utf-8'))
+        
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        if fmt == 'parquet':
+            pq.write_table(table, sink)
+        else:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        return io.BytesIO(sink.getvalue())
+
+# ========================================================================================
+# GUARDED LLM CLIENT (ADMISSION CONTROL, RATE LIMITING, CIRCUIT BREAKER)
+# ========================================================================================
+
+class LLMUnavailableError(Exception):
+    """Raised when the guarded LLM client refuses or fails a call"""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter"""
+
+    def __init__(self, rate_per_sec: float, capacity: int):
+        self.rate_per_sec = rate_per_sec
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate_per_sec)
+        self.last_refill = now
+
+    def acquire(self, timeout: float) -> bool:
+        """Take one token, waiting at most `timeout` seconds for a refill"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate_per_sec
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or wait > remaining:
+                return False
+            time.sleep(wait)
+
+    def available(self) -> float:
+        with self.lock:
+            self._refill()
+            return round(self.tokens, 2)
+
+class CircuitBreaker:
+    """Rolling-window circuit breaker tripping on error rate or slow-call rate"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, window_size: int, min_calls: int, failure_rate_threshold: float,
+                 slow_call_seconds: float, slow_call_rate_threshold: float,
+                 cooldown_seconds: float, half_open_probes: int):
+        self.window = deque(maxlen=window_size)
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.half_open_probes = half_open_probes
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+        self.trip_count = 0
+        self.lock = threading.Lock()
+
+    def _transition(self, state: str):
+        if state != self.state:
+            logger.warning(f"LLM circuit breaker {self.state} -> {state}")
+        self.state = state
+        if state == self.OPEN:
+            self.opened_at = time.monotonic()
+            self.trip_count += 1
+        if state in (self.OPEN, self.CLOSED):
+            self.window.clear()
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+
+    def allow(self) -> bool:
+        """Return True if a call may proceed (reserving a probe slot when half-open)"""
+        with self.lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.cooldown_seconds:
+                    return False
+                self._transition(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN:
+                if self.probes_in_flight >= self.half_open_probes:
+                    return False
+                self.probes_in_flight += 1
+            return True
+
+    def release(self):
+        """Give back a probe slot reserved by allow() for a call that never ran"""
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.probes_in_flight = max(self.probes_in_flight - 1, 0)
+
+    def record(self, success: bool, duration: float):
+        """Record the outcome of a call admitted by allow()"""
+        slow = duration >= self.slow_call_seconds
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.probes_in_flight = max(self.probes_in_flight - 1, 0)
+                if not success or slow:
+                    self._transition(self.OPEN)
+                    return
+                self.probe_successes += 1
+                if self.probe_successes >= self.half_open_probes:
+                    self._transition(self.CLOSED)
+                return
+            if self.state != self.CLOSED:
+                return
+
+            self.window.append((success, slow))
+            if len(self.window) < self.min_calls:
+                return
+            failures = sum(1 for ok, _ in self.window if not ok)
+            slow_calls = sum(1 for _, is_slow in self.window if is_slow)
+            if (failures / len(self.window) >= self.failure_rate_threshold or
+                    slow_calls / len(self.window) >= self.slow_call_rate_threshold):
+                self._transition(self.OPEN)
+
+    def get_status(self) -> Dict[str, Any]:
+        with self.lock:
+            retry_in = 0.0
+            if self.state == self.OPEN:
+                retry_in = max(self.cooldown_seconds - (time.monotonic() - self.opened_at), 0)
+            return {
+                'state': self.state,
+                'window_calls': len(self.window),
+                'window_failures': sum(1 for ok, _ in self.window if not ok),
+                'window_slow_calls': sum(1 for _, is_slow in self.window if is_slow),
+                'trip_count': self.trip_count,
+                'retry_in_seconds': round(retry_in, 2)
+            }
+
+class GuardedLLMClient:
+    """Shared LLM client with bounded concurrency, wait queue, deadlines, rate limit and breaker"""
+
+    def __init__(self):
+        self.max_concurrency = int(os.environ.get('LLM_MAX_CONCURRENCY', 4))
+        self.max_queue = int(os.environ.get('LLM_MAX_QUEUE', 16))
+        self.queue_timeout = float(os.environ.get('LLM_QUEUE_TIMEOUT_SECONDS', 2.0))
+        self.call_timeout = float(os.environ.get('LLM_CALL_TIMEOUT_SECONDS', 10.0))
+
+        self.rate_limiter = TokenBucket(
+            rate_per_sec=float(os.environ.get('LLM_RATE_PER_SECOND', 2.0)),
+            capacity=int(os.environ.get('LLM_RATE_BURST', 5))
+        )
+        self.breaker = CircuitBreaker(
+            window_size=int(os.environ.get('LLM_BREAKER_WINDOW', 20)),
+            min_calls=int(os.environ.get('LLM_BREAKER_MIN_CALLS', 5)),
+            failure_rate_threshold=float(os.environ.get('LLM_BREAKER_FAILURE_RATE', 0.5)),
+            slow_call_seconds=float(os.environ.get('LLM_BREAKER_SLOW_CALL_SECONDS', 6.0)),
+            slow_call_rate_threshold=float(os.environ.get('LLM_BREAKER_SLOW_CALL_RATE', 0.5)),
+            cooldown_seconds=float(os.environ.get('LLM_BREAKER_COOLDOWN_SECONDS', 30.0)),
+            half_open_probes=int(os.environ.get('LLM_BREAKER_HALF_OPEN_PROBES', 1))
+        )
+
+        # Slots are released when the upstream call actually finishes, so a caller
+        # giving up at its deadline never lets more than max_concurrency calls pile up
+        self.slots = threading.BoundedSemaphore(self.max_concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='llm')
+        self.lock = threading.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.counters = {
+            'calls': 0, 'succeeded': 0, 'failed': 0, 'timed_out': 0,
+            'rejected_queue_full': 0, 'rejected_queue_timeout': 0,
+            'rejected_rate_limited': 0, 'rejected_circuit_open': 0
+        }
+        self._llm = None
+
+    def _count(self, key: str):
+        with self.lock:
+            self.counters[key] += 1
+
+    def _get_llm(self, api_key: str):
+        if self._llm is None:
+            self._llm = ChatGoogleGenerativeAI(
+                model="gemini-1.5-flash",
+                google_api_key=api_key,
+                temperature=0.3,
+                max_tokens=1000,
+                timeout=self.call_timeout,
+                max_retries=0
+            )
+        return self._llm
+
+    def _acquire_slot(self, deadline: float):
+        with self.lock:
+            if self.waiting >= self.max_queue:
+                self.counters['rejected_queue_full'] += 1
+                raise LLMUnavailableError('queue_full', 'LLM wait queue is full')
+            self.waiting += 1
+        try:
+            if not self.slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+                self._count('rejected_queue_timeout')
+                raise LLMUnavailableError('queue_timeout', 'Timed out waiting for an LLM slot')
+        finally:
+            with self.lock:
+                self.waiting -= 1
+        with self.lock:
+            self.in_flight += 1
+
+    def _release_slot(self, _future=None):
+        with self.lock:
+            self.in_flight -= 1
+        self.slots.release()
+
+    def invoke(self, api_key: str, messages: List[Any]) -> Any:
+        """Run one LLM call under admission control; raises LLMUnavailableError when refused or failed"""
+        self._count('calls')
+
+        if not self.breaker.allow():
+            self._count('rejected_circuit_open')
+            raise LLMUnavailableError('circuit_open', 'LLM circuit breaker is open')
+
+        admitted = False
+        try:
+            queue_deadline = time.monotonic() + self.queue_timeout
+            if not self.rate_limiter.acquire(self.queue_timeout):
+                self._count('rejected_rate_limited')
+                raise LLMUnavailableError('rate_limited', 'LLM rate limit exceeded')
+            self._acquire_slot(queue_deadline)
+            admitted = True
+        finally:
+            if not admitted:
+                # Refused locally, so the upstream was never judged
+                self.breaker.release()
+
+        started = time.monotonic()
+        try:
+            llm = self._get_llm(api_key)
+            future = self.executor.submit(llm, messages)
+        except Exception as e:
+            # The call never started, so hand back the slot (and any half-open probe) here
+            self._release_slot()
+            self._count('failed')
+            self.breaker.record(False, time.monotonic() - started)
+            raise LLMUnavailableError('client_error', f'LLM client could not start the call: {str(e)}')
+        future.add_done_callback(self._release_slot)
+        try:
+            result = future.result(timeout=self.call_timeout)
+        except FutureTimeoutError:
+            self._count('timed_out')
+            self.breaker.record(False, time.monotonic() - started)
+            raise LLMUnavailableError('timeout', f'LLM call exceeded {self.call_timeout}s deadline')
+        except Exception as e:
+            self._count('failed')
+            self.breaker.record(False, time.monotonic() - started)
+            raise LLMUnavailableError('upstream_error', f'LLM call failed: {str(e)}')
+
+        self._count('succeeded')
+        self.breaker.record(True, time.monotonic() - started)
+        return result
+
+    def get_status(self) -> Dict[str, Any]:
+        with self.lock:
+            status = {
+                'queue_depth': self.waiting,
+                'max_queue': self.max_queue,
+                'in_flight': self.in_flight,
+                'max_concurrency': self.max_concurrency,
+                'call_timeout_seconds': self.call_timeout,
+                'counters': dict(self.counters)
+            }
+        status['rate_limiter'] = {
+            'tokens_available': self.rate_limiter.available(),
+            'rate_per_second': self.rate_limiter.rate_per_sec,
+            'burst': self.rate_limiter.capacity
+        }
+        status['circuit_breaker'] = self.breaker.get_status()
+        return status
+
+# Shared across request threads
+llm_client = GuardedLLMClient()
+
+# ========================================================================================
+# LOAN DECISION ENGINE
+# ========================================================================================
+
+# Single source of truth for loan eligibility and pricing, shared by the single-row
+# make_loan_decision and the column-oriented LoanDecisionEngine
+LOAN_POLICY = {
+    'min_score': 45,
+    'min_earning': 1000,
+    'min_tenure': 3,
+    'max_amount_cap': 500000,
+    # Ordered from best to worst; a tier applies when nova_score >= min_score
+    'tiers': [
+        {'min_score': 80, 'earning_multiplier': 40, 'interest_rate': 10.5, 'tenure_months': 36},
+        {'min_score': 65, 'earning_multiplier': 30, 'interest_rate': 12.5, 'tenure_months': 24},
+        {'min_score': 50, 'earning_multiplier': 20, 'interest_rate': 15.0, 'tenure_months': 18},
+        {'min_score': 0, 'earning_multiplier': 15, 'interest_rate': 18.0, 'tenure_months': 12}
+    ]
+}
+
+def annuity_factors(interest_rates: np.ndarray, tenure_months: np.ndarray) -> np.ndarray:
+    """EMI per unit of principal, r(1+r)^n / ((1+r)^n - 1), for annual rates and tenures in months"""
+    monthly_rate = np.asarray(interest_rates, dtype=float) / 100 / 12
+    growth = (1 + monthly_rate) ** np.asarray(tenure_months, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(monthly_rate > 0, monthly_rate * growth / (growth - 1), 1 / np.asarray(tenure_months, dtype=float))
+
+class LoanDecisionEngine:
+    """Vectorized loan eligibility, tiering and EMI computation over score/earning/tenure arrays"""
+
+    REJECTION_REASON = (
+        f"Does not meet minimum criteria (Score: {LOAN_POLICY['min_score']}+, "
+        f"Earning: ₹{LOAN_POLICY['min_earning']}+, Tenure: {LOAN_POLICY['min_tenure']}+ months)"
+    )
+
+    TIER_MIN_SCORES = np.array([tier['min_score'] for tier in LOAN_POLICY['tiers']], dtype=float)
+    TIER_MULTIPLIERS = np.array([tier['earning_multiplier'] for tier in LOAN_POLICY['tiers']], dtype=float)
+    TIER_INTEREST_RATES = np.array([tier['interest_rate'] for tier in LOAN_POLICY['tiers']], dtype=float)
+    TIER_TENURES = np.array([tier['tenure_months'] for tier in LOAN_POLICY['tiers']], dtype=np.int64)
+
+    # Precomputed once so no row ever evaluates the (1+r)**n power series
+    TIER_ANNUITY_FACTORS = annuity_factors(TIER_INTEREST_RATES, TIER_TENURES)
+
+    @staticmethod
+    def tier_index(nova_score: float) -> int:
+        """Index into LOAN_POLICY['tiers'] of the tier a score falls into"""
+        for i, min_score in enumerate(LoanDecisionEngine.TIER_MIN_SCORES):
+            if nova_score >= min_score:
+                return i
+        return len(LoanDecisionEngine.TIER_MIN_SCORES) - 1
+
+    @staticmethod
+    def decide_batch(nova_scores: np.ndarray, monthly_earnings: np.ndarray,
+                     tenure_months: np.ndarray) -> Dict[str, np.ndarray]:
+        """Apply eligibility rules and tier tables column-wise; returns arrays aligned with the inputs"""
+        nova_scores = np.asarray(nova_scores, dtype=float)
+        monthly_earnings = np.asarray(monthly_earnings, dtype=float)
+        tenure_months = np.asarray(tenure_months, dtype=float)
+
+        approved = ((nova_scores >= LOAN_POLICY['min_score']) &
+                    (monthly_earnings >= LOAN_POLICY['min_earning']) &
+                    (tenure_months >= LOAN_POLICY['min_tenure']))
+
+        # First tier whose threshold the score meets (tiers are ordered best to worst)
+        meets = nova_scores[:, None] >= LoanDecisionEngine.TIER_MIN_SCORES[None, :]
+        tiers = np.where(meets.any(axis=1), meets.argmax(axis=1), len(LoanDecisionEngine.TIER_MIN_SCORES) - 1)
+
+        max_amount = np.minimum(
+            np.where(approved, monthly_earnings, 0) * LoanDecisionEngine.TIER_MULTIPLIERS[tiers],
+            LOAN_POLICY['max_amount_cap']
+        )
+        monthly_emi = max_amount * LoanDecisionEngine.TIER_ANNUITY_FACTORS[tiers]
+
+        return {
+            'approved': approved,
+            'max_amount': max_amount.astype(np.int64),
+            'interest_rate': np.where(approved, LoanDecisionEngine.TIER_INTEREST_RATES[tiers], 0.0),
+            'tenure_months': np.where(approved, LoanDecisionEngine.TIER_TENURES[tiers], 0),
+            'monthly_emi': monthly_emi.astype(np.int64)
+        }
+
+    @staticmethod
+    def to_dicts(decisions: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+        """Expand decide_batch output into make_loan_decision-shaped dicts for JSON responses"""
+        results = []
+        for approved, max_amount, interest_rate, tenure, emi in zip(
+                decisions['approved'].tolist(), decisions['max_amount'].tolist(),
+                decisions['interest_rate'].tolist(), decisions['tenure_months'].tolist(),
+                decisions['monthly_emi'].tolist()):
+            if approved:
+                results.append({
+                    'approved': True,
+                    'max_amount': max_amount,
+                    'interest_rate': interest_rate,
+                    'tenure_months': tenure,
+                    'monthly_emi': emi
+                })
+            else:
+                results.append({
+                    'approved': False,
+                    'reason': LoanDecisionEngine.REJECTION_REASON,
+                    'max_amount': 0,
+                    'interest_rate': 0,
+                    'tenure_months': 0
+                })
+        return results
 
 # ========================================================================================
 # ML-POWERED NOVA SCORE CALCULATION ENGINE
 # ========================================================================================
 
 class MLNovaScoreCalculator:
+
+    # (threshold, risk category) from best to worst; scores below the last band are "Poor"
+    RISK_BANDS = [(80, "Excellent"), (65, "Good"), (50, "Fair")]
     
     @staticmethod
-    def predict_nova_score(partner_type: str, data: Dict[str, Any]) -> float:
-        """Predict Nova Score using trained ML model"""
+    def predict_nova_score(partner_type: str, data: Dict[str, Any], feature_vector: np.ndarray = None) -> float:
+        """Predict Nova Score using trained ML model (reusing a prepared feature vector if given)"""
         try:
             # Prepare features for prediction
-            feature_vector = FeatureEngineer.prepare_features_for_prediction(
-                data, ml_loader.model_info['feature_names']
-            )
+            if feature_vector is None:
+                feature_vector = FeatureEngineer.prepare_features_for_prediction(
+                    data, ml_loader.model_info['feature_names']
+                )
             
             # Scale features
             feature_vector_scaled = ml_loader.scaler.transform(feature_vector)
@@ -312,27 +1258,53 @@ class MLNovaScoreCalculator:
         except Exception as e:
             logger.error(f"ML prediction error: {str(e)}")
             raise Exception(f"Failed to predict Nova Score: {str(e)}")
+
+    @staticmethod
+    def predict_nova_scores(df: pd.DataFrame, missing_as_default: bool = False) -> np.ndarray:
+        """Predict Nova Scores for every row of a DataFrame with one batched model call"""
+        feature_matrix = FeatureEngineer.prepare_feature_matrix(
+            df, ml_loader.model_info['feature_names'], missing_as_default
+        )
+        return MLNovaScoreCalculator.score_feature_matrix(feature_matrix)
+
+    @staticmethod
+    def score_feature_matrix(feature_matrix: np.ndarray) -> np.ndarray:
+        """Scale and score an already prepared feature matrix"""
+        try:
+            feature_matrix_scaled = ml_loader.scaler.transform(feature_matrix)
+            predictions = np.asarray(ml_loader.model.predict(feature_matrix_scaled), dtype=float)
+            return np.round(np.clip(predictions, 0, 100), 2)
+
+        except Exception as e:
+            logger.error(f"ML batch prediction error: {str(e)}")
+            raise Exception(f"Failed to predict Nova Scores: {str(e)}")
     
     @staticmethod
     def get_risk_category(nova_score: float) -> str:
         """Get risk category based on Nova Score"""
-        if nova_score >= 80:
-            return "Excellent"
-        elif nova_score >= 65:
-            return "Good"
-        elif nova_score >= 50:
-            return "Fair"
-        else:
-            return "Poor"
+        for threshold, category in MLNovaScoreCalculator.RISK_BANDS:
+            if nova_score >= threshold:
+                return category
+        return "Poor"
+
+    @staticmethod
+    def get_risk_categories(nova_scores: np.ndarray) -> np.ndarray:
+        """Vectorized get_risk_category"""
+        bands = MLNovaScoreCalculator.RISK_BANDS
+        return np.select(
+            [nova_scores >= threshold for threshold, _ in bands],
+            [category for _, category in bands],
+            default="Poor"
+        )
     
     @staticmethod
     def make_loan_decision(nova_score: float, monthly_earning: int, tenure_months: int) -> Dict[str, Any]:
         """Make loan decision based on Nova Score and business rules"""
         
         # Business rules
-        min_score = 45
-        min_earning = 1000
-        min_tenure = 3
+        min_score = LOAN_POLICY['min_score']
+        min_earning = LOAN_POLICY['min_earning']
+        min_tenure = LOAN_POLICY['min_tenure']
         
         # Check eligibility
         eligible = (nova_score >= min_score and 
@@ -342,40 +1314,25 @@ class MLNovaScoreCalculator:
         if not eligible:
             return {
                 'approved': False,
-                'reason': f'Does not meet minimum criteria (Score: {min_score}+, Earning: ₹{min_earning}+, Tenure: {min_tenure}+ months)',
+                'reason': LoanDecisionEngine.REJECTION_REASON,
                 'max_amount': 0,
                 'interest_rate': 0,
                 'tenure_months': 0
             }
         
         # Calculate loan terms based on Nova Score
-        if nova_score >= 80:
-            max_amount = monthly_earning * 40
-            interest_rate = 10.5
-            tenure_months_offered = 36
-        elif nova_score >= 65:
-            max_amount = monthly_earning * 30
-            interest_rate = 12.5
-            tenure_months_offered = 24
-        elif nova_score >= 50:
-            max_amount = monthly_earning * 20
-            interest_rate = 15.0
-            tenure_months_offered = 18
-        else:
-            max_amount = monthly_earning * 15
-            interest_rate = 18.0
-            tenure_months_offered = 12
+        tier_index = LoanDecisionEngine.tier_index(nova_score)
+        tier = LOAN_POLICY['tiers'][tier_index]
         
         # Cap maximum loan amount
-        max_amount = min(max_amount, 500000)
+        max_amount = min(monthly_earning * tier['earning_multiplier'], LOAN_POLICY['max_amount_cap'])
         
         return {
             'approved': True,
             'max_amount': int(max_amount),
-            'interest_rate': interest_rate,
-            'tenure_months': tenure_months_offered,
-            'monthly_emi': int((max_amount * (interest_rate/100/12) * (1 + interest_rate/100/12)**tenure_months_offered) / 
-                              ((1 + interest_rate/100/12)**tenure_months_offered - 1))
+            'interest_rate': tier['interest_rate'],
+            'tenure_months': tier['tenure_months'],
+            'monthly_emi': int(max_amount * LoanDecisionEngine.TIER_ANNUITY_FACTORS[tier_index])
         }
     
     @staticmethod
@@ -387,15 +1344,7 @@ class MLNovaScoreCalculator:
             api_key = os.environ.get("GOOGLE_API_KEY")
             
             if not api_key:
-                raise ValueError("Google API key not provided. Pass it as parameter or set GOOGLE_API_KEY environment variable.")
-            
-            # Initialize Gemini 1.5 Flash model
-            llm = ChatGoogleGenerativeAI(
-                model="gemini-1.5-flash",
-                google_api_key=api_key,
-                temperature=0.3,
-                max_tokens=1000
-            )
+                raise LLMUnavailableError('not_configured', "Google API key not provided. Set the GOOGLE_API_KEY environment variable.")
             
             # Prepare the prompt with user data
             prompt = f"""
@@ -423,136 +1372,2449 @@ class MLNovaScoreCalculator:
             {{"recommendations": ["rec1", "rec2", "rec3", "rec4", "rec5"]}}
             """
             
-            # Generate recommendations using Gemini
+            # Generate recommendations using Gemini through the shared guarded client
             message = HumanMessage(content=prompt)
-            response = llm([message])
+            response = llm_client.invoke(api_key, [message])
             
-            # Parse JSON response
-            response_data = json.loads(response.content.strip())
+            # Parse JSON response, tolerating code fences or prose around the object
+            content = str(response.content)
+            response_data = json.loads(content[content.find('{'):content.rfind('}') + 1])
             recommendations = response_data.get('recommendations', [])
+            if not isinstance(recommendations, list):
+                raise ValueError("'recommendations' is not a list")
             
-            # Ensure exactly 5 recommendations
-            if len(recommendations) >= 5:
-                return recommendations[:5]
+            # At most 5 recommendations
+            return [str(recommendation) for recommendation in recommendations[:5]]
             
+        except LLMUnavailableError as e:
+            logger.warning(f"AI recommendations unavailable ({e.reason}): {e}")
+            raise
         except Exception as e:
             logger.error(f"AI recommendation error: {e}")
-            raise Exception(f"Failed to generate recommendations: {str(e)}")
+            raise LLMUnavailableError('bad_response', f"Failed to generate recommendations: {str(e)}")
+
+# ========================================================================================
+# WHAT-IF / SENSITIVITY ANALYSIS
+# ========================================================================================
+
+class WhatIfAnalyzer:
+    MAX_POINTS = int(os.environ.get('WHAT_IF_MAX_POINTS', 10000))
+
+    @staticmethod
+    def expand_axis(field: str, spec: Any) -> List[Any]:
+        """Turn a grid axis spec (list of values or {start, stop, step}) into a list of values"""
+        if isinstance(spec, list):
+            values = spec
+        elif isinstance(spec, dict) and {'start', 'stop', 'step'} <= set(spec):
+            start, stop, step = spec['start'], spec['stop'], spec['step']
+            if not all(isinstance(v, (int, float)) for v in (start, stop, step)) or step <= 0 or stop < start:
+                raise ValueError(f'Invalid range for {field}: need numeric start <= stop and step > 0')
+            # Size the range before materializing it
+            n_values = np.ceil((stop - start) / step + 0.5)
+            if not np.isfinite(n_values) or n_values > WhatIfAnalyzer.MAX_POINTS:
+                raise ValueError(f'Range for {field} exceeds the limit of {WhatIfAnalyzer.MAX_POINTS} values')
+            values = np.round(np.arange(start, stop + step / 2, step), 6).tolist()
+            if all(isinstance(v, int) for v in (start, stop, step)):
+                values = [int(v) for v in values]
+        else:
+            raise ValueError(f'Grid axis {field} must be a list of values or an object with start, stop and step')
+
+        if not values:
+            raise ValueError(f'Grid axis {field} has no values')
+        return values
+
+    @staticmethod
+    def build_scenarios(partner_type: str, partner_data: Dict[str, Any], grid: Dict[str, Any] = None,
+                        perturbations: List[Dict[str, Any]] = None):
+        """Build the scenario DataFrame (row 0 is the unchanged base) and the grid axes"""
+        # Only the partner inputs the model reads can be varied
+        variable_fields = {name for name, *_ in PARTNER_SCHEMAS[partner_type].fields}
+        if grid:
+            fields = set(grid)
+        else:
+            if not all(isinstance(overrides, dict) for overrides in perturbations):
+                raise ValueError('Each perturbation must be an object of field overrides')
+            fields = {field for overrides in perturbations for field in overrides}
+        unknown = sorted(fields - variable_fields)
+        if unknown:
+            raise ValueError(f"Cannot vary {', '.join(unknown)}; {partner_type} scenarios can vary "
+                             f"{', '.join(sorted(variable_fields))}")
+
+        axes = {}
+        if grid:
+            n_points = 1
+            for field, spec in grid.items():
+                axes[field] = WhatIfAnalyzer.expand_axis(field, spec)
+                n_points *= len(axes[field])
+                if n_points > WhatIfAnalyzer.MAX_POINTS:
+                    break
+        else:
+            n_points = len(perturbations)
+
+        if n_points > WhatIfAnalyzer.MAX_POINTS:
+            raise ValueError(f'Scenario count {n_points} exceeds the limit of {WhatIfAnalyzer.MAX_POINTS}')
+
+        # Every distinct value goes through the same checks as a single assessment
+        if grid:
+            for field, values in axes.items():
+                for value in values:
+                    validate_partner_data(partner_type, {field: value})
+        else:
+            for overrides in perturbations:
+                validate_partner_data(partner_type, overrides)
+
+        # Fields absent from the base stay NaN in the base row and are scored as missing
+        base = dict(partner_data, partner_type=partner_type)
+        if grid:
+            scenarios = pd.DataFrame([base]).iloc[np.zeros(n_points + 1, dtype=int)].reset_index(drop=True)
+            mesh = np.meshgrid(*[np.asarray(values) for values in axes.values()], indexing='ij')
+            for field, values in zip(axes, mesh):
+                scenarios[field] = np.concatenate([[base.get(field, np.nan)], values.ravel()])
+        else:
+            scenarios = pd.DataFrame([base] + [dict(base, **overrides) for overrides in perturbations])
+
+        return scenarios, axes
+
+    @staticmethod
+    def minimal_band_crossings(scenarios: pd.DataFrame, nova_scores: np.ndarray,
+                               changed_fields: List[str]) -> List[Dict[str, Any]]:
+        """For each risk band, find the scenario reaching it with the smallest normalized change"""
+        values = scenarios[changed_fields].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        base_values = np.array([
+            FeatureEngineer.DEFAULT_VALUES.get(field, 0) if np.isnan(value) else value
+            for field, value in zip(changed_fields, values[0])
+        ])
+        values = np.where(np.isnan(values), base_values, values)
+        spans = np.nanmax(values, axis=0) - np.nanmin(values, axis=0)
+        spans[~(spans > 0)] = 1.0
+        distance = np.nansum(np.abs(values - base_values) / spans, axis=1)
+
+        crossings = []
+        for threshold, category in reversed(MLNovaScoreCalculator.RISK_BANDS):
+            crossing = {'band': category, 'threshold': threshold}
+            if nova_scores[0] >= threshold:
+                crossing.update({'already_met': True, 'reachable': True})
+            else:
+                candidates = np.flatnonzero(nova_scores[1:] >= threshold) + 1
+                crossing['already_met'] = False
+                crossing['reachable'] = bool(len(candidates))
+                if len(candidates):
+                    best = candidates[np.argmin(distance[candidates])]
+                    crossing['nova_score'] = float(nova_scores[best])
+                    crossing['changes'] = {
+                        field: {'from': base_values[i].item(), 'to': values[best][i].item()}
+                        for i, field in enumerate(changed_fields)
+                        if values[best][i] != base_values[i]
+                    }
+            crossings.append(crossing)
+        return crossings
+
+# ========================================================================================
+# IDEMPOTENCY
+# ========================================================================================
+
+IDEMPOTENCY_WINDOW_SECONDS = int(os.environ.get('IDEMPOTENCY_WINDOW_SECONDS', 24 * 60 * 60))
+
+def normalize_payload_value(value: Any) -> Any:
+    """Canonical form of a payload value so JSON and CSV submissions hash alike"""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        value = float(value)
+        return int(value) if value.is_integer() else round(value, 9)
+    return value
+
+# Content hashes cover the sorted, non-missing payload fields as self-delimiting tokens:
+# <len>:<key> then n<float64 bits> for numbers, b1/b0 for booleans or s<len>:<text> for anything else.
+# Numbers are rounded to 9 decimals first, so JSON and CSV submissions hash alike.
+
+def canonical_number_tokens(values: np.ndarray) -> np.ndarray:
+    """Exact text form of normalized numbers (the bits of the rounded float64)"""
+    normalized = np.round(np.asarray(values, dtype=np.float64), 9) + 0.0  # folds -0.0 into 0.0
+    return normalized.view(np.uint64).astype(str)
+
+def hash_token(key: str, value: Any) -> str:
+    """Hash token of one payload field"""
+    prefix = f'{len(str(key))}:{key}'
+    if isinstance(value, (bool, np.bool_)):
+        return prefix + ('b1' if value else 'b0')
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return prefix + 'n' + canonical_number_tokens(np.array([value], dtype=np.float64))[0]
+    text = value if isinstance(value, str) else str(value)
+    return f'{prefix}s{len(text)}:{text}'
+
+def hash_tokens(key: str, column: pd.Series) -> np.ndarray:
+    """hash_token plus ',' for every cell of a column, with an empty string for missing cells
+
+    Tokens are built once per distinct value.
+    """
+    prefix = f'{len(str(key))}:{key}'
+    present = column.notna().to_numpy()
+    tokens = np.full(len(column), '', dtype=object)
+    if not present.any():
+        return tokens
+    values = column[present]
+    if pd.api.types.is_bool_dtype(column):
+        tokens[present] = np.where(values.to_numpy(dtype=bool), prefix + 'b1,', prefix + 'b0,')
+    elif pd.api.types.is_numeric_dtype(column):
+        codes, uniques = pd.factorize(values.to_numpy(dtype=np.float64))
+        tokens[present] = (prefix + 'n' + canonical_number_tokens(uniques).astype(object) + ',')[codes]
+    elif pd.api.types.infer_dtype(values, skipna=True) == 'string':
+        codes, uniques = pd.factorize(values.to_numpy(dtype=object))
+        tokens[present] = np.array([f'{prefix}s{len(value)}:{value},' for value in uniques], dtype=object)[codes]
+    else:
+        # 1, 1.0 and True are equal keys to factorize but hash differently, so group by type first
+        objects = values.to_numpy(dtype=object)
+        types = values.map(type).to_numpy(dtype=object)
+        column_tokens = np.empty(len(objects), dtype=object)
+        for kind in pd.unique(types):
+            of_kind = types == kind
+            codes, uniques = pd.factorize(objects[of_kind])
+            column_tokens[of_kind] = np.array([hash_token(key, value) + ',' for value in uniques], dtype=object)[codes]
+        tokens[present] = column_tokens
+    return tokens
+
+def content_hasher(versioned: bool = True) -> 'hashlib._Hash':
+    """sha256 already fed the model version (unless versioned is False), copied for every payload"""
+    return hashlib.sha256(f'{ml_loader.model_version}|'.encode('utf-8') if versioned else b'')
+
+def compute_content_hash(partner_data: Dict[str, Any], versioned: bool = True) -> str:
+    """Stable hash of a partner payload (including partner_type) plus the model version
+
+    With versioned=False the hash covers the payload alone, so it survives model redeploys.
+    """
+    digest = content_hasher(versioned)
+    digest.update(''.join(
+        hash_token(key, partner_data[key]) + ','
+        for key in sorted(partner_data)
+        if not (partner_data[key] is None or (isinstance(partner_data[key], float) and np.isnan(partner_data[key])))
+    ).encode('utf-8'))
+    return digest.hexdigest()
+
+def compute_content_hashes(df: pd.DataFrame) -> List[str]:
+    """compute_content_hash of every row of a DataFrame, built column-wise"""
+    columns = [hash_tokens(key, df[key]).tolist() for key in sorted(df.columns, key=str)]
+    base = content_hasher()
+    hashes = []
+    for tokens in zip(*columns):
+        digest = base.copy()
+        digest.update(''.join(tokens).encode('utf-8'))
+        hashes.append(digest.hexdigest())
+    return hashes
+
+def normalize_partner_key(value: Any) -> Optional[str]:
+    """Canonical partner identity key (numeric ids read as floats lose their '.0')"""
+    if value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value)):
+        return None
+    value = normalize_payload_value(value)
+    key = str(value).strip()
+    return key or None
+
+# ========================================================================================
+# DATABASE OPERATIONS
+# ========================================================================================
+
+INSERT_ASSESSMENT_SQL = '''
+    INSERT INTO assessments (
+        id, partner_type, partner_name, monthly_earning, yearly_earning,
+        customer_rating, active_days, working_tenure_ingrab, nova_score,
+        loan_approved, loan_amount, interest_rate, risk_category, additional_data,
+        content_hash, idempotency_key, model_version, recommendations, partner_key, payload_hash
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_OR_IGNORE_ASSESSMENT_SQL = INSERT_ASSESSMENT_SQL.replace('INSERT INTO', 'INSERT OR IGNORE INTO')
+
+def sql_text(value: Any) -> Optional[str]:
+    """Text column value; anything else is stored as its string form"""
+    return None if value is None else str(value)
+
+def sql_number(field: str, value: Any) -> Any:
+    """Numeric column value as a plain Python number SQLite can bind"""
+    if value is None:
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            raise ValueError(f"{field} must be a number")
+    if not isinstance(value, (int, float, np.integer, np.floating)):
+        raise ValueError(f"{field} must be a number")
+    value = value.item() if isinstance(value, np.generic) else value
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    # Integers beyond 64 bits cannot be bound
+    return float(value) if isinstance(value, int) and abs(value) >= 2 ** 63 else value
+
+def assessment_to_row(assessment_id: str, assessment_data: Dict[str, Any]) -> tuple:
+    """Build the INSERT parameters for one assessment (coerced so every value binds)"""
+    return (
+        assessment_id,
+        sql_text(assessment_data['partner_type']),
+        sql_text(assessment_data['partner_name']),
+        sql_number('monthly_earning', assessment_data['monthly_earning']),
+        sql_number('yearly_earning', assessment_data['yearly_earning']),
+        sql_number('customer_rating', assessment_data['customer_rating']),
+        sql_number('active_days', assessment_data['active_days']),
+        sql_number('working_tenure_ingrab', assessment_data['working_tenure_ingrab']),
+        sql_number('nova_score', assessment_data['nova_score']),
+        sql_number('loan_approved', assessment_data['loan_approved']),
+        sql_number('loan_amount', assessment_data['loan_amount']),
+        sql_number('interest_rate', assessment_data['interest_rate']),
+        sql_text(assessment_data['risk_category']),
+        FeatureStore.extra_fields_json(assessment_data.get('additional_data', {})),
+        assessment_data.get('content_hash'),
+        assessment_data.get('idempotency_key'),
+        ml_loader.model_version,
+        json.dumps(assessment_data['recommendations']) if 'recommendations' in assessment_data else None,
+        normalize_partner_key(assessment_data.get('partner_key')),
+        assessment_data.get('payload_hash')
+    )
+
+def save_assessment(assessment_data: Dict[str, Any]) -> str:
+    """Save assessment to database (queued for the background writer in write-behind mode)"""
+    assessment_id = str(uuid.uuid4())
+    row = assessment_to_row(assessment_id, assessment_data)
+    feature_row = FeatureStore.feature_row(assessment_id, assessment_data)
+    
+    if write_behind.enabled:
+        write_behind.submit(row, feature_row)
+        return assessment_id
+    
+    conn = sqlite3.connect('novascore.db')
+    cursor = conn.cursor()
+    
+    cursor.execute(INSERT_ASSESSMENT_SQL, row)
+    if feature_row:
+        cursor.execute(FeatureStore.INSERT_SQL, feature_row)
+    
+    conn.commit()
+    conn.close()
+    
+    return assessment_id
+
+def save_assessments_bulk(assessments: List[Dict[str, Any]]) -> List[str]:
+    """Save many assessments in one transaction"""
+    conn = sqlite3.connect('novascore.db')
+    cursor = conn.cursor()
+    
+    assessment_ids = [str(uuid.uuid4()) for _ in assessments]
+    
+    cursor.executemany(INSERT_ASSESSMENT_SQL, [
+        assessment_to_row(assessment_id, assessment_data)
+        for assessment_id, assessment_data in zip(assessment_ids, assessments)
+    ])
+    cursor.executemany(FeatureStore.INSERT_SQL, [
+        feature_row for feature_row in (
+            FeatureStore.feature_row(assessment_id, assessment_data)
+            for assessment_id, assessment_data in zip(assessment_ids, assessments)
+        ) if feature_row
+    ])
+    
+    conn.commit()
+    conn.close()
+    
+    return assessment_ids
+
+def find_recent_assessment(content_hash: str = None, idempotency_key: str = None) -> Optional[Dict[str, Any]]:
+    """Most recent assessment inside the idempotency window with the given key or content hash"""
+    if IDEMPOTENCY_WINDOW_SECONDS <= 0:
+        return None
+    
+    column, value = ('idempotency_key', idempotency_key) if idempotency_key else ('content_hash', content_hash)
+    
+    conn = sqlite3.connect('novascore.db')
+    cursor = conn.cursor()
+    
+    cursor.execute(f'''
+        SELECT * FROM assessments
+        WHERE {column} = ? AND created_at >= datetime('now', ?)
+        ORDER BY created_at DESC
+        LIMIT 1
+    ''', (value, f'-{IDEMPOTENCY_WINDOW_SECONDS} seconds'))
+    
+    row = cursor.fetchone()
+    result = dict(zip([description[0] for description in cursor.description], row)) if row else None
+    
+    conn.close()
+    return result
+
+def is_same_payload(existing: Dict[str, Any], content_hash: str, payload_hash: str) -> bool:
+    """Whether a stored assessment was made from the same payload, whichever model scored it"""
+    if existing.get('payload_hash'):
+        return existing['payload_hash'] == payload_hash
+    # Rows stored before payload hashes can only be compared under the model version
+    return existing['content_hash'] == content_hash
+
+def find_recent_assessments_by_hash(content_hashes: List[str], chunk_size: int = 500) -> Dict[str, Dict[str, Any]]:
+    """Map content hash -> most recent assessment inside the idempotency window, one indexed query per chunk"""
+    if IDEMPOTENCY_WINDOW_SECONDS <= 0 or not content_hashes:
+        return {}
+    
+    conn = sqlite3.connect('novascore.db')
+    cursor = conn.cursor()
+    
+    found = {}
+    unique_hashes = list(dict.fromkeys(content_hashes))
+    for start in range(0, len(unique_hashes), chunk_size):
+        chunk = unique_hashes[start:start + chunk_size]
+        cursor.execute(f'''
+            SELECT content_hash, id, partner_name, nova_score, risk_category, loan_approved, loan_amount
+            FROM assessments
+            WHERE content_hash IN ({','.join('?' * len(chunk))}) AND created_at >= datetime('now', ?)
+            ORDER BY created_at
+        ''', (*chunk, f'-{IDEMPOTENCY_WINDOW_SECONDS} seconds'))
+        for content_hash, assessment_id, partner_name, nova_score, risk_category, loan_approved, loan_amount in cursor.fetchall():
+            # Later rows overwrite earlier ones, keeping the most recent
+            found[content_hash] = {
+                'assessment_id': assessment_id,
+                'partner_name': partner_name,
+                'nova_score': nova_score,
+                'risk_category': risk_category,
+                'loan_approved': bool(loan_approved),
+                'loan_amount': loan_amount
+            }
+    
+    conn.close()
+    return found
+
+def get_assessment_history(limit: int = 100) -> List[Dict[str, Any]]:
+    """Get assessment history from database"""
+    conn = sqlite3.connect('novascore.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT * FROM assessments 
+        ORDER BY created_at DESC 
+        LIMIT ?
+    ''', (limit,))
+    
+    columns = [description[0] for description in cursor.description]
+    results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    conn.close()
+    return results
+
+def get_partner_latest(partner_key: str) -> Optional[Dict[str, Any]]:
+    """Latest assessment of a partner from the lookup table kept current on write"""
+    conn = sqlite3.connect('novascore.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('SELECT * FROM partner_latest WHERE partner_key = ?', (partner_key,))
+    
+    row = cursor.fetchone()
+    result = dict(zip([description[0] for description in cursor.description], row)) if row else None
+    
+    conn.close()
+    return result
+
+def get_partner_timeline(partner_key: str, since: str = None, until: str = None,
+                         limit: int = 100) -> List[Dict[str, Any]]:
+    """Score and loan history of a partner, newest first, as a range scan on (partner_key, created_at)"""
+    conn = sqlite3.connect('novascore.db')
+    cursor = conn.cursor()
+    
+    conditions, params = ['partner_key = ?'], [partner_key]
+    if since:
+        conditions.append('created_at >= ?')
+        params.append(since)
+    if until:
+        conditions.append('created_at < ?')
+        params.append(until)
+    params.append(limit)
+    
+    cursor.execute(f'''
+        SELECT id AS assessment_id, created_at, nova_score, risk_category,
+               loan_approved, loan_amount, interest_rate, model_version
+        FROM assessments INDEXED BY idx_assessments_partner_key
+        WHERE {' AND '.join(conditions)}
+        ORDER BY created_at DESC
+        LIMIT ?
+    ''', params)
+    
+    columns = [description[0] for description in cursor.description]
+    results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    conn.close()
+    
+    # Older history lives in the monthly archives
+    if len(results) < limit:
+        results.extend(AssessmentArchiver.partner_timeline(partner_key, since, until, limit - len(results)))
+    return results
+
+def get_dashboard_stats() -> Dict[str, Any]:
+    """Get dashboard statistics"""
+    conn = sqlite3.connect('novascore.db')
+    cursor = conn.cursor()
+    
+    # Totals cover the live table plus the rollups of archived assessments
+    cursor.execute('''
+        SELECT SUM(total), SUM(approved), SUM(score_sum) FROM (
+            SELECT COUNT(*) AS total, SUM(loan_approved = 1) AS approved, SUM(nova_score) AS score_sum
+            FROM assessments
+            UNION ALL
+            SELECT SUM(assessments), SUM(approved), SUM(nova_score_sum)
+            FROM assessment_rollups
+        )
+    ''')
+    total_assessments, approved_count, score_sum = cursor.fetchone()
+    total_assessments = total_assessments or 0
+    
+    # Approval rate
+    approval_rate = ((approved_count or 0) / max(total_assessments, 1)) * 100
+    
+    # Average Nova Score
+    avg_nova_score = (score_sum or 0) / max(total_assessments, 1)
+    
+    # Risk distribution
+    cursor.execute('''
+        SELECT risk_category, SUM(count) FROM (
+            SELECT risk_category, COUNT(*) AS count FROM assessments GROUP BY risk_category
+            UNION ALL
+            SELECT risk_category, SUM(assessments) FROM assessment_rollups GROUP BY risk_category
+        )
+        GROUP BY risk_category
+    ''')
+    risk_distribution = dict(cursor.fetchall())
+    
+    # Partner type distribution
+    cursor.execute('''
+        SELECT partner_type, SUM(count) FROM (
+            SELECT partner_type, COUNT(*) AS count FROM assessments GROUP BY partner_type
+            UNION ALL
+            SELECT partner_type, SUM(assessments) FROM assessment_rollups GROUP BY partner_type
+        )
+        GROUP BY partner_type
+    ''')
+    partner_distribution = dict(cursor.fetchall())
+    
+    # Recent assessments trend (last 7 days)
+    cursor.execute('''
+        SELECT date, SUM(count) FROM (
+            SELECT DATE(created_at) AS date, COUNT(*) AS count
+            FROM assessments
+            WHERE created_at >= datetime('now', '-7 days')
+            GROUP BY DATE(created_at)
+            UNION ALL
+            SELECT day, SUM(assessments)
+            FROM assessment_rollups
+            WHERE day >= DATE('now', '-7 days')
+            GROUP BY day
+        )
+        GROUP BY date
+        ORDER BY date
+    ''')
+    daily_assessments = [{'date': row[0], 'count': row[1]} for row in cursor.fetchall()]
+    
+    conn.close()
+    
+    return {
+        'total_assessments': total_assessments,
+        'approval_rate': round(approval_rate, 2),
+        'avg_nova_score': round(avg_nova_score, 2),
+        'risk_distribution': risk_distribution,
+        'partner_distribution': partner_distribution,
+        'daily_assessments': daily_assessments,
+        'model_info': {
+            'model_name': ml_loader.model_info['best_model_name'],
+            'features_count': len(ml_loader.model_info['feature_names'])
+        }
+    }
+
+# ========================================================================================
+# FEATURE STORAGE
+# ========================================================================================
+
+class FeatureStore:
+    """Per-assessment model feature vectors packed into a side table, read back as NumPy arrays"""
+
+    FEATURE_NAMES = ml_loader.model_info['feature_names']
+    # Identifies the feature order a blob was packed with
+    LAYOUT = hashlib.sha1(','.join(FEATURE_NAMES).encode('utf-8')).hexdigest()[:12]
+    DTYPE = np.dtype('<f8')
+    # Bit i of provided_mask is set when FEATURE_NAMES[i] was read from the payload or computed from it,
+    # and clear when it was filled from FeatureEngineer.DEFAULT_VALUES
+    MASK_BITS = np.left_shift(np.int64(1), np.arange(len(FEATURE_NAMES), dtype=np.int64))
+
+    # Payload keys already kept in assessment columns or the feature vector
+    STRUCTURED_FIELDS = set(FEATURE_NAMES) | {'partner_type', 'partner_name', 'partner_key'}
+
+    INSERT_SQL = '''
+        INSERT INTO assessment_features (assessment_id, feature_layout, features, provided_mask)
+        VALUES (?, ?, ?, ?)
+    '''
+    INSERT_OR_IGNORE_SQL = INSERT_SQL.replace('INSERT INTO', 'INSERT OR IGNORE INTO')
+
+    # partner_type -> computed_mask
+    COMPUTED_MASKS = {}
+
+    @staticmethod
+    def is_missing(value: Any) -> bool:
+        return value is None or (isinstance(value, float) and np.isnan(value))
+
+    @staticmethod
+    def provided_mask(data: Dict[str, Any]) -> int:
+        """Bitmask of the model features a payload supplies, directly or through derived features"""
+        mask = FeatureStore.computed_mask(data.get('partner_type', 'driver'))
+        for i, name in enumerate(FeatureStore.FEATURE_NAMES):
+            if name in data and not FeatureStore.is_missing(data[name]):
+                mask |= 1 << i
+        return mask
+
+    @staticmethod
+    def computed_mask(partner_type: str) -> int:
+        """Bits of the features computed for every payload of a partner type (cached per type)"""
+        mask = FeatureStore.COMPUTED_MASKS.get(partner_type)
+        if mask is None:
+            partner_types = np.array([partner_type], dtype=object)
+            mask = 0
+            for i, name in enumerate(FeatureStore.FEATURE_NAMES):
+                if FeatureEngineer.computed_rows(name, partner_types)[0]:
+                    mask |= 1 << i
+            FeatureStore.COMPUTED_MASKS[partner_type] = mask
+        return mask
+
+    @staticmethod
+    def provided_masks(df: pd.DataFrame) -> np.ndarray:
+        """Vectorized provided_mask for every row of a DataFrame"""
+        if 'partner_type' in df.columns:
+            partner_types = df['partner_type'].astype(object).to_numpy()
+        else:
+            partner_types = np.full(len(df), 'driver', dtype=object)
+        present = np.column_stack([
+            (df[name].notna().to_numpy() if name in df.columns else np.zeros(len(df), dtype=bool)) |
+            FeatureEngineer.computed_rows(name, partner_types)
+            for name in FeatureStore.FEATURE_NAMES
+        ])
+        return present.astype(np.int64) @ FeatureStore.MASK_BITS
+
+    @staticmethod
+    def extra_fields_json(data: Dict[str, Any]) -> Optional[str]:
+        """JSON of the payload keys not stored elsewhere, or None when there are none
+
+        Feature fields holding something other than a number are kept, since the vector only has NaN for them.
+        """
+        extras = {
+            key: value for key, value in data.items()
+            if not FeatureStore.is_missing(value) and (
+                key not in FeatureStore.STRUCTURED_FIELDS or
+                (key in FeatureStore.FEATURE_NAMES and
+                 (isinstance(value, bool) or not isinstance(value, (int, float, np.integer, np.floating))))
+            )
+        }
+        return json.dumps(extras) if extras else None
+
+    @staticmethod
+    def feature_row(assessment_id: str, assessment_data: Dict[str, Any]) -> Optional[tuple]:
+        """INSERT parameters for an assessment's feature vector, or None if it has none"""
+        features = assessment_data.get('features')
+        if features is None:
+            return None
+        return (
+            assessment_id,
+            FeatureStore.LAYOUT,
+            np.asarray(features, dtype=FeatureStore.DTYPE).tobytes(),
+            int(assessment_data.get('provided_mask', 0))
+        )
+
+    @staticmethod
+    def unpack(blobs: List[bytes]) -> np.ndarray:
+        """Stack packed vectors into an (n, n_features) matrix with a single copy"""
+        return np.frombuffer(b''.join(blobs), dtype=FeatureStore.DTYPE).reshape(-1, len(FeatureStore.FEATURE_NAMES))
+
+    @staticmethod
+    def load_matrix(partner_type: str = None, since: str = None, until: str = None,
+                    limit: int = None) -> Dict[str, Any]:
+        """Feature matrix for stored assessments in the current layout, in insertion order"""
+        conditions = ['f.feature_layout = ?']
+        params = [FeatureStore.LAYOUT]
+        if partner_type:
+            conditions.append('a.partner_type = ?')
+            params.append(partner_type)
+        if since:
+            conditions.append('a.created_at >= ?')
+            params.append(since)
+        if until:
+            conditions.append('a.created_at < ?')
+            params.append(until)
+        
+        conn = sqlite3.connect('novascore.db')
+        cursor = conn.cursor()
+        
+        cursor.execute(f'''
+            SELECT f.assessment_id, f.features, f.provided_mask
+            FROM assessment_features f
+            JOIN assessments a ON a.id = f.assessment_id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY a.rowid
+            {'LIMIT ?' if limit else ''}
+        ''', (*params, limit) if limit else params)
+        rows = cursor.fetchall()
+        
+        conn.close()
+        
+        return {
+            'assessment_ids': [row[0] for row in rows],
+            'features': FeatureStore.unpack([row[1] for row in rows]),
+            'provided_mask': np.array([row[2] for row in rows], dtype=np.int64),
+            'feature_names': FeatureStore.FEATURE_NAMES
+        }
+
+    @staticmethod
+    def get_features(assessment_id: str) -> Optional[Dict[str, Any]]:
+        """Named feature values for one assessment"""
+        conn = sqlite3.connect('novascore.db')
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT feature_layout, features, provided_mask FROM assessment_features WHERE assessment_id = ?
+        ''', (assessment_id,))
+        row = cursor.fetchone()
+        
+        conn.close()
+        
+        if not row or row[0] != FeatureStore.LAYOUT:
+            return None
+        vector = FeatureStore.unpack([row[1]])[0]
+        return {
+            'features': dict(zip(FeatureStore.FEATURE_NAMES, vector.tolist())),
+            'provided_features': [
+                name for i, name in enumerate(FeatureStore.FEATURE_NAMES) if row[2] >> i & 1
+            ]
+        }
+
+    @staticmethod
+    def register_layout():
+        """Record the feature names of the current layout"""
+        conn = sqlite3.connect('novascore.db')
+        conn.execute('INSERT OR IGNORE INTO feature_layouts (layout, feature_names) VALUES (?, ?)',
+                     (FeatureStore.LAYOUT, json.dumps(FeatureStore.FEATURE_NAMES)))
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def layout_names(layout: str) -> Optional[List[str]]:
+        """Feature names a stored layout was packed with"""
+        if layout == FeatureStore.LAYOUT:
+            return FeatureStore.FEATURE_NAMES
+        conn = sqlite3.connect('novascore.db')
+        row = conn.execute('SELECT feature_names FROM feature_layouts WHERE layout = ?', (layout,)).fetchone()
+        conn.close()
+        return json.loads(row[0]) if row else None
+
+    @staticmethod
+    def parse_payload(partner_type: str, additional_data: Optional[str]) -> Dict[str, Any]:
+        """Partner payload from an additional_data column"""
+        try:
+            payload = json.loads(additional_data) if additional_data else {}
+        except json.JSONDecodeError:
+            payload = {}
+        payload.setdefault('partner_type', partner_type)
+        return payload
+
+    @staticmethod
+    def payload_from_vector(partner_type: str, additional_data: Optional[str], names: List[str],
+                            vector: np.ndarray, provided_mask: int) -> Dict[str, Any]:
+        """Rebuild a partner payload from a vector packed in another layout plus the stored extras"""
+        payload = FeatureStore.parse_payload(partner_type, additional_data)
+        for i, name in enumerate(names):
+            if provided_mask >> i & 1:
+                payload[name] = float(vector[i])
+        return payload
+
+    @staticmethod
+    def build_matrix(payloads: List[Dict[str, Any]]) -> np.ndarray:
+        """Current-layout feature matrix for payload dicts, matching prepare_features_for_prediction"""
+        features = np.zeros((len(payloads), len(FeatureStore.FEATURE_NAMES)))
+        # Rows with the same key set form a frame with exactly dict semantics
+        groups = {}
+        for i, payload in enumerate(payloads):
+            groups.setdefault(frozenset(payload), []).append(i)
+        for indices in groups.values():
+            frame = pd.DataFrame([payloads[i] for i in indices])
+            features[indices] = FeatureEngineer.prepare_feature_matrix(frame, FeatureStore.FEATURE_NAMES)
+        return features
+
+    @staticmethod
+    def migrate_existing(chunk_size: int = 5000, dry_run: bool = False) -> int:
+        """Build feature rows for assessments stored before the side table; additional_data is left as is"""
+        conn = sqlite3.connect('novascore.db')
+        cursor = conn.cursor()
+        
+        migrated = 0
+        last_rowid = 0
+        while True:
+            cursor.execute('''
+                SELECT a.rowid, a.id, a.partner_type, a.additional_data
+                FROM assessments a
+                LEFT JOIN assessment_features f ON f.assessment_id = a.id
+                WHERE f.assessment_id IS NULL AND a.rowid > ?
+                ORDER BY a.rowid
+                LIMIT ?
+            ''', (last_rowid, chunk_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_rowid = rows[-1][0]
+            migrated += len(rows)
+            if dry_run:
+                continue
+            
+            payloads = [FeatureStore.parse_payload(row[2], row[3]) for row in rows]
+            features = FeatureStore.build_matrix(payloads)
+            
+            cursor.executemany(FeatureStore.INSERT_OR_IGNORE_SQL, [
+                (row[1], FeatureStore.LAYOUT, features[i].astype(FeatureStore.DTYPE).tobytes(),
+                 FeatureStore.provided_mask(payloads[i]))
+                for i, row in enumerate(rows)
+            ])
+            conn.commit()
+        
+        conn.close()
+        if migrated and not dry_run:
+            logger.info(f"Migrated {migrated} assessments to packed feature storage")
+        return migrated
+
+    @staticmethod
+    def compact_payloads(chunk_size: int = 5000, dry_run: bool = False) -> Dict[str, int]:
+        """Drop the fields kept in columns or the feature vector from additional_data
+
+        A row is only rewritten when its stored vector equals the one rebuilt from its
+        payload, so nothing the vector cannot reproduce is lost.
+        """
+        conn = sqlite3.connect('novascore.db')
+        cursor = conn.cursor()
+        
+        report = {'compacted': 0, 'mismatched': 0}
+        last_rowid = 0
+        while True:
+            cursor.execute('''
+                SELECT a.rowid, a.id, a.partner_type, a.additional_data, f.features
+                FROM assessments a
+                JOIN assessment_features f ON f.assessment_id = a.id
+                WHERE f.feature_layout = ? AND a.additional_data IS NOT NULL AND a.rowid > ?
+                ORDER BY a.rowid
+                LIMIT ?
+            ''', (FeatureStore.LAYOUT, last_rowid, chunk_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_rowid = rows[-1][0]
+            
+            # Rows already compacted (or not valid JSON) are left alone
+            pending = []
+            for row in rows:
+                try:
+                    json.loads(row[3])
+                except json.JSONDecodeError:
+                    continue
+                payload = FeatureStore.parse_payload(row[2], row[3])
+                compacted = FeatureStore.extra_fields_json(payload)
+                if compacted != row[3]:
+                    pending.append((row, payload, compacted))
+            if not pending:
+                continue
+            rows, payloads, compacted = zip(*pending)
+            rebuilt = FeatureStore.build_matrix(payloads)
+            stored = FeatureStore.unpack([row[4] for row in rows])
+            verified = np.all((rebuilt == stored) | (np.isnan(rebuilt) & np.isnan(stored)), axis=1)
+            
+            report['compacted'] += int(verified.sum())
+            report['mismatched'] += int((~verified).sum())
+            if dry_run:
+                continue
+            cursor.executemany('UPDATE assessments SET additional_data = ? WHERE id = ?', [
+                (compacted[i], row[1]) for i, row in enumerate(rows) if verified[i]
+            ])
+            conn.commit()
+        
+        conn.close()
+        return report
+
+FeatureStore.register_layout()
+
+@app.cli.command('migrate-features')
+@click.option('--chunk-size', type=int, default=5000, help='Rows per transaction')
+@click.option('--dry-run', is_flag=True, help='Report what would change without writing')
+@click.option('--compact', is_flag=True,
+              help='Also drop fields held in columns or verified feature vectors from additional_data')
+def migrate_features_command(chunk_size, dry_run, compact):
+    """Pack feature vectors for assessments stored before the feature side table"""
+    report = {'dry_run': dry_run, 'migrated': FeatureStore.migrate_existing(chunk_size, dry_run)}
+    if compact:
+        report.update(FeatureStore.compact_payloads(chunk_size, dry_run))
+    click.echo(json.dumps(report, indent=2))
+
+# ========================================================================================
+# RE-SCORING
+# ========================================================================================
+
+def process_pool_context():
+    """Fork where available so pool workers inherit the loaded model instead of re-importing the app"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('fork' if 'fork' in methods else None)
+
+def rescore_chunk(after_rowid: int, until_rowid: int) -> Dict[str, Any]:
+    """Read and score the assessments in a rowid range with the loaded model (runs in pool workers)"""
+    conn = sqlite3.connect('novascore.db')
+    rows = conn.execute(RescoreJob.SELECT_SQL, (after_rowid, until_rowid)).fetchall()
+    conn.close()
+    if not rows:
+        return {'last_rowid': until_rowid, 'scanned': 0}
+    
+    current = np.array([row[11] == FeatureStore.LAYOUT for row in rows], dtype=bool)
+    features = np.empty((len(rows), len(FeatureStore.FEATURE_NAMES)))
+    if current.any():
+        features[current] = FeatureStore.unpack([row[12] for row, ok in zip(rows, current) if ok])
+    
+    # Rows packed in an older layout (or never packed) are rebuilt from their payload
+    feature_rows = []
+    stale = np.flatnonzero(~current)
+    if len(stale):
+        layouts = {}
+        payloads = []
+        for i in stale:
+            row = rows[i]
+            if row[11] and row[11] not in layouts:
+                layouts[row[11]] = FeatureStore.layout_names(row[11])
+            names = layouts.get(row[11])
+            if names:
+                vector = np.frombuffer(row[12], dtype=FeatureStore.DTYPE)
+                payloads.append(FeatureStore.payload_from_vector(row[2], row[10], names, vector, row[13]))
+            else:
+                payloads.append(FeatureStore.parse_payload(row[2], row[10]))
+        features[stale] = FeatureStore.build_matrix(payloads)
+        feature_rows = [
+            (rows[i][1], FeatureStore.LAYOUT, features[i].astype(FeatureStore.DTYPE).tobytes(),
+             FeatureStore.provided_mask(payload))
+            for i, payload in zip(stale.tolist(), payloads)
+        ]
+    
+    nova_scores = MLNovaScoreCalculator.score_feature_matrix(features)
+    risk_categories = MLNovaScoreCalculator.get_risk_categories(nova_scores)
+    loan_decisions = LoanDecisionEngine.decide_batch(
+        nova_scores,
+        np.array([row[3] for row in rows], dtype=float),
+        np.array([row[4] for row in rows], dtype=float)
+    )
+    
+    # Diff against the stored values for the report
+    old_scores = np.array([row[5] for row in rows], dtype=float)
+    old_risk = np.array([row[6] for row in rows], dtype=object)
+    old_approved = np.array([bool(row[7]) for row in rows], dtype=bool)
+    old_amounts = np.array([row[8] or 0 for row in rows], dtype=np.int64)
+    deltas = np.abs(nova_scores - old_scores)
+    deltas[np.isnan(deltas)] = 0
+    risk_changed = old_risk != risk_categories
+    changed = ((deltas > 0) | risk_changed | (old_approved != loan_decisions['approved']) |
+               (old_amounts != loan_decisions['max_amount']))
+    
+    transitions = {}
+    for old, new in zip(old_risk[risk_changed].tolist(), risk_categories[risk_changed].tolist()):
+        key = f"{old} -> {new}"
+        transitions[key] = transitions.get(key, 0) + 1
+    largest = np.argsort(-deltas)[:RescoreJob.REPORT_LARGEST]
+    
+    return {
+        'last_rowid': until_rowid,
+        'assessment_ids': [row[1] for row in rows],
+        'nova_scores': nova_scores,
+        'risk_categories': risk_categories.tolist(),
+        'loan_decisions': loan_decisions,
+        'feature_rows': feature_rows,
+        'scanned': len(rows),
+        'changed': int(changed.sum()),
+        'score_change_sum': float(deltas.sum()),
+        'score_change_max': float(deltas.max()),
+        'risk_transitions': transitions,
+        'approved_to_rejected': int((old_approved & ~loan_decisions['approved']).sum()),
+        'rejected_to_approved': int((~old_approved & loan_decisions['approved']).sum()),
+        'largest_changes': [
+            {
+                'assessment_id': rows[i][1],
+                'old_score': rows[i][5],
+                'new_score': float(nova_scores[i]),
+                'old_risk_category': rows[i][6],
+                'new_risk_category': str(risk_categories[i])
+            }
+            for i in largest.tolist() if deltas[i] > 0
+        ]
+    }
+
+class RescoreJob:
+    """Re-score the stored assessments with the loaded model
+    
+    The table is streamed in rowid order; chunks are scored on a process pool and written
+    back in order, one transaction per chunk, with a checkpoint after each so an interrupted
+    run resumes where it stopped. A dry run only reports what would change.
+    """
+    
+    WORKERS = int(os.environ.get('RESCORE_WORKERS', str(os.cpu_count() or 1)))
+    CHUNK_SIZE = int(os.environ.get('RESCORE_CHUNK_SIZE', '20000'))
+    CHECKPOINT_PATH = os.environ.get('RESCORE_CHECKPOINT', 'rescore.checkpoint.json')
+    REPORT_LARGEST = 20
+    
+    SELECT_SQL = '''
+        SELECT a.rowid, a.id, a.partner_type, a.monthly_earning, a.working_tenure_ingrab,
+               a.nova_score, a.risk_category, a.loan_approved, a.loan_amount, a.interest_rate,
+               a.additional_data, f.feature_layout, f.features, f.provided_mask
+        FROM assessments a
+        LEFT JOIN assessment_features f ON f.assessment_id = a.id
+        WHERE a.rowid > ? AND a.rowid <= ?
+        ORDER BY a.rowid
+    '''
+    UPDATE_SQL = '''
+        UPDATE assessments
+        SET nova_score = ?, risk_category = ?, loan_approved = ?, loan_amount = ?, interest_rate = ?,
+            model_version = ?
+        WHERE id = ?
+    '''
+    
+    def __init__(self, workers: int = None, chunk_size: int = None, checkpoint_path: str = None,
+                 dry_run: bool = False, restart: bool = False):
+        self.workers = max(1, workers or self.WORKERS)
+        self.chunk_size = max(1, chunk_size or self.CHUNK_SIZE)
+        self.checkpoint_path = checkpoint_path or self.CHECKPOINT_PATH
+        self.dry_run = dry_run
+        self.restart = restart
+        self.report = {
+            'model_version': ml_loader.model_version,
+            'dry_run': dry_run,
+            'resumed_from_rowid': 0,
+            'scanned': 0,
+            'changed': 0,
+            'updated': 0,
+            'score_change_sum': 0.0,
+            'score_change_max': 0.0,
+            'risk_transitions': {},
+            'approved_to_rejected': 0,
+            'rejected_to_approved': 0,
+            'largest_changes': []
+        }
+    
+    def load_checkpoint(self) -> int:
+        """rowid to resume after, if a checkpoint exists for the loaded model"""
+        if self.dry_run or self.restart or not os.path.exists(self.checkpoint_path):
+            return 0
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('model_version') != ml_loader.model_version:
+            logger.info("Ignoring re-scoring checkpoint written for a different model")
+            return 0
+        self.report['updated'] = checkpoint.get('updated', 0)
+        return checkpoint['last_rowid']
+    
+    def save_checkpoint(self, last_rowid: int):
+        temp_path = f"{self.checkpoint_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'model_version': ml_loader.model_version,
+                'last_rowid': last_rowid,
+                'updated': self.report['updated']
+            }, f)
+        os.replace(temp_path, self.checkpoint_path)
+    
+    def iter_ranges(self, after_rowid: int):
+        """(after_rowid, until_rowid] bounds of consecutive chunks, found by walking the rowid index"""
+        conn = sqlite3.connect('novascore.db')
+        cursor = conn.cursor()
+        try:
+            last_rowid = cursor.execute('SELECT MAX(rowid) FROM assessments').fetchone()[0] or 0
+            while after_rowid < last_rowid:
+                cursor.execute('SELECT rowid FROM assessments WHERE rowid > ? ORDER BY rowid LIMIT 1 OFFSET ?',
+                               (after_rowid, self.chunk_size - 1))
+                row = cursor.fetchone()
+                until_rowid = row[0] if row else last_rowid
+                yield after_rowid, until_rowid
+                after_rowid = until_rowid
+        finally:
+            conn.close()
+    
+    def apply(self, result: Dict[str, Any]):
+        """Fold a scored chunk into the report and, unless dry-running, write it back"""
+        report = self.report
+        if not result['scanned']:
+            if not self.dry_run:
+                self.save_checkpoint(result['last_rowid'])
+            return
+        for key in ('scanned', 'changed', 'score_change_sum', 'approved_to_rejected', 'rejected_to_approved'):
+            report[key] += result[key]
+        report['score_change_max'] = max(report['score_change_max'], result['score_change_max'])
+        for key, count in result['risk_transitions'].items():
+            report['risk_transitions'][key] = report['risk_transitions'].get(key, 0) + count
+        report['largest_changes'] = sorted(
+            report['largest_changes'] + result['largest_changes'],
+            key=lambda change: -abs(change['new_score'] - (change['old_score'] or 0))
+        )[:self.REPORT_LARGEST]
+        
+        if self.dry_run:
+            return
+        decisions = result['loan_decisions']
+        updates = list(zip(
+            result['nova_scores'].tolist(), result['risk_categories'], decisions['approved'].tolist(),
+            decisions['max_amount'].tolist(), decisions['interest_rate'].tolist(),
+            [ml_loader.model_version] * result['scanned'], result['assessment_ids']
+        ))
+        conn = sqlite3.connect('novascore.db', timeout=30)
+        try:
+            conn.executemany(self.UPDATE_SQL, updates)
+            conn.executemany(
+                FeatureStore.INSERT_SQL.replace('INSERT INTO', 'INSERT OR REPLACE INTO'),
+                result['feature_rows']
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        report['updated'] += len(updates)
+        self.save_checkpoint(result['last_rowid'])
+    
+    def run(self) -> Dict[str, Any]:
+        started = time.time()
+        after_rowid = self.load_checkpoint()
+        self.report['resumed_from_rowid'] = after_rowid
+        
+        if self.workers == 1:
+            for bounds in self.iter_ranges(after_rowid):
+                self.apply(rescore_chunk(*bounds))
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=process_pool_context()) as pool:
+                in_flight = deque()
+                for bounds in self.iter_ranges(after_rowid):
+                    in_flight.append(pool.submit(rescore_chunk, *bounds))
+                    # Bound read-ahead and write results back in rowid order
+                    if len(in_flight) >= self.workers * 2:
+                        self.apply(in_flight.popleft().result())
+                while in_flight:
+                    self.apply(in_flight.popleft().result())
+        
+        if not self.dry_run and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        
+        report = self.report
+        report['mean_abs_score_change'] = round(report.pop('score_change_sum') / report['scanned'], 4) if report['scanned'] else 0.0
+        report['max_abs_score_change'] = round(report.pop('score_change_max'), 2)
+        report['elapsed_seconds'] = round(time.time() - started, 2)
+        logger.info(f"Re-scored {report['scanned']} assessments in {report['elapsed_seconds']}s "
+                    f"({report['changed']} changed, dry run: {self.dry_run})")
+        return report
+
+@app.cli.command('rescore')
+@click.option('--workers', type=int, default=None, help='Worker processes (default RESCORE_WORKERS or CPU count)')
+@click.option('--chunk-size', type=int, default=None, help='Rows per chunk (default RESCORE_CHUNK_SIZE)')
+@click.option('--checkpoint', default=None, help='Checkpoint file (default RESCORE_CHECKPOINT)')
+@click.option('--dry-run', is_flag=True, help='Report what would change without writing')
+@click.option('--restart', is_flag=True, help='Ignore an existing checkpoint')
+@click.option('--report', 'report_path', default=None, help='Also write the JSON report to this file')
+def rescore_command(workers, chunk_size, checkpoint, dry_run, restart, report_path):
+    """Re-score stored assessments with the currently loaded model"""
+    report = RescoreJob(workers, chunk_size, checkpoint, dry_run, restart).run()
+    output = json.dumps(report, indent=2)
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write(output)
+    click.echo(output)
+
+# ========================================================================================
+# SHARDED BATCH EXECUTION
+# ========================================================================================
+
+def score_batch_frame(frame: pd.DataFrame, out: np.ndarray):
+    """Fill out with the feature matrix followed by BatchShardExecutor.OUTPUT_COLUMNS for each row"""
+    n_features = len(FeatureStore.FEATURE_NAMES)
+    features = FeatureEngineer.prepare_feature_matrix(frame, FeatureStore.FEATURE_NAMES)
+    nova_scores = MLNovaScoreCalculator.score_feature_matrix(features)
+    tenure = frame['working_tenure_ingrab'] if 'working_tenure_ingrab' in frame.columns else pd.Series(0, index=frame.index)
+    loan_decisions = LoanDecisionEngine.decide_batch(
+        nova_scores,
+        pd.to_numeric(frame['monthly_earning'], errors='coerce').to_numpy(),
+        pd.to_numeric(tenure, errors='coerce').to_numpy()
+    )
+    
+    out[:, :n_features] = features
+    out[:, n_features] = FeatureStore.provided_masks(frame)
+    out[:, n_features + 1] = nova_scores
+    out[:, n_features + 2] = loan_decisions['approved']
+    out[:, n_features + 3] = loan_decisions['max_amount']
+    out[:, n_features + 4] = loan_decisions['interest_rate']
+
+def hash_batch_shard(frame: pd.DataFrame) -> List[str]:
+    return compute_content_hashes(frame)
+
+def score_batch_shard(shm_name: str, shape: tuple, start: int, frame: pd.DataFrame, forked: bool) -> int:
+    """Score one shard into its row range of the shared output block (runs in pool workers)"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    if os.name == 'posix' and not forked:
+        # The parent owns and unlinks the block; stop this worker's own tracker from unlinking it too
+        # (forked workers share the parent's tracker, where the parent's unlink unregisters it)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    try:
+        out = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        score_batch_frame(frame, out[start:start + len(frame)])
+        del out
+    finally:
+        shm.close()
+    return len(frame)
+
+class BatchShardExecutor:
+    """Splits large batch uploads into shards processed on a process pool
+    
+    Workers are forked from the app so each holds the loaded model; start() forks them at
+    import, before the background threads exist. Shards write features,
+    scores and loan terms straight into one shared-memory block at their row offset, which
+    keeps the merge in input order without pickling per-row results. If a worker dies
+    (e.g. OOM-killed), that batch is processed in-process and the next one gets a new pool.
+    """
+    
+    WORKERS = int(os.environ.get('BATCH_WORKERS', '1'))
+    SHARD_SIZE = int(os.environ.get('BATCH_SHARD_SIZE', '50000'))
+    OUTPUT_COLUMNS = ['provided_mask', 'nova_score', 'approved', 'max_amount', 'interest_rate']
+    
+    def __init__(self, workers: int = None, shard_size: int = None):
+        self.workers = max(1, workers or self.WORKERS)
+        self.shard_size = max(1, shard_size or self.SHARD_SIZE)
+        self.context = process_pool_context()
+        self.forked = self.context.get_start_method() == 'fork'
+        self.pool = None
+        self.lock = threading.Lock()
+    
+    def start(self):
+        """Create the pool and fork every worker while the process is still single-threaded"""
+        if self.workers > 1:
+            pool = self.get_pool()
+            for future in [pool.submit(os.getpid) for _ in range(self.workers)]:
+                future.result()
+    
+    def get_pool(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.pool is None:
+                if self.forked and os.name == 'posix':
+                    # Workers must inherit the parent's tracker rather than each starting their own
+                    resource_tracker.ensure_running()
+                self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=self.context)
+            return self.pool
+    
+    def discard(self, pool: ProcessPoolExecutor, error: Exception):
+        """Drop a pool that lost a worker so the next large batch starts a fresh one"""
+        logger.error(f"Batch worker pool is broken ({error}); processing this batch in-process")
+        with self.lock:
+            if self.pool is pool:
+                self.pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+    
+    def is_parallel(self, n_rows: int) -> bool:
+        return self.workers > 1 and n_rows > self.shard_size
+    
+    def shards(self, n_rows: int) -> List[tuple]:
+        return [(start, min(start + self.shard_size, n_rows)) for start in range(0, n_rows, self.shard_size)]
+    
+    def content_hashes(self, frame: pd.DataFrame) -> List[str]:
+        """compute_content_hash for every row, in input order"""
+        if not self.is_parallel(len(frame)):
+            return hash_batch_shard(frame)
+        pool = self.get_pool()
+        try:
+            futures = [pool.submit(hash_batch_shard, frame.iloc[start:stop]) for start, stop in self.shards(len(frame))]
+            return [content_hash for future in futures for content_hash in future.result()]
+        except BrokenProcessPool as e:
+            self.discard(pool, e)
+            return hash_batch_shard(frame)
+    
+    def score(self, frame: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Feature matrix, provided masks, Nova Scores and loan terms for every row, in input order"""
+        n_features = len(FeatureStore.FEATURE_NAMES)
+        shape = (len(frame), n_features + len(self.OUTPUT_COLUMNS))
+        
+        if not self.is_parallel(len(frame)):
+            out = np.empty(shape)
+            score_batch_frame(frame, out)
+        else:
+            pool = self.get_pool()
+            shm = shared_memory.SharedMemory(create=True, size=shape[0] * shape[1] * 8)
+            try:
+                futures = [
+                    pool.submit(score_batch_shard, shm.name, shape, start, frame.iloc[start:stop], self.forked)
+                    for start, stop in self.shards(len(frame))
+                ]
+                for future in futures:
+                    future.result()
+                out = np.ndarray(shape, dtype=np.float64, buffer=shm.buf).copy()
+            except BrokenProcessPool as e:
+                self.discard(pool, e)
+                out = np.empty(shape)
+                score_batch_frame(frame, out)
+            finally:
+                shm.close()
+                shm.unlink()
+        
+        return {
+            'features': out[:, :n_features],
+            'provided_mask': out[:, n_features].astype(np.int64),
+            'nova_score': out[:, n_features + 1],
+            'approved': out[:, n_features + 2].astype(bool),
+            'max_amount': out[:, n_features + 3].astype(np.int64),
+            'interest_rate': out[:, n_features + 4]
+        }
+
+batch_executor = BatchShardExecutor()
+batch_executor.start()
+
+# ========================================================================================
+# BULK EXPORT
+# ========================================================================================
+
+class StreamSink(io.RawIOBase):
+    """Write-only file object that buffers output until the streaming response drains it"""
+    
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self.position
+    
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+class AssessmentExporter:
+    """Streams assessments as CSV or Parquet in (created_at, rowid) order, one cursor chunk at a time
+    
+    Memory stays bounded by the chunk size. The range ends at the high-water mark taken when
+    the export starts; its resume token starts the next export right after it.
+    """
+    
+    CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '5000'))
+    MIMETYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+    
+    # Exported columns with their Parquet types
+    COLUMNS = [
+        ('id', 'string'),
+        ('partner_type', 'string'),
+        ('partner_name', 'string'),
+        ('partner_key', 'string'),
+        ('monthly_earning', 'float64'),
+        ('yearly_earning', 'float64'),
+        ('customer_rating', 'float64'),
+        ('active_days', 'float64'),
+        ('working_tenure_ingrab', 'float64'),
+        ('nova_score', 'float64'),
+        ('loan_approved', 'bool'),
+        ('loan_amount', 'int64'),
+        ('interest_rate', 'float64'),
+        ('risk_category', 'string'),
+        ('created_at', 'string'),
+        ('additional_data', 'string'),
+        ('content_hash', 'string'),
+        ('idempotency_key', 'string'),
+        ('model_version', 'string'),
+        ('recommendations', 'string')
+    ]
+    
+    def __init__(self, fmt: str = 'csv', partner_type: str = None, since: str = None, until: str = None,
+                 resume_token: str = None, limit: int = None, compress: bool = False):
+        self.fmt = fmt
+        self.partner_type = partner_type
+        self.since = since
+        self.until = until
+        self.after = AssessmentExporter.decode_token(resume_token) if resume_token else None
+        self.limit = limit
+        self.compress = compress
+    
+    @staticmethod
+    def encode_token(created_at: str, rowid: int) -> str:
+        payload = json.dumps({'created_at': created_at, 'rowid': rowid}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+    
+    @staticmethod
+    def decode_token(token: str) -> tuple:
+        """(created_at, rowid) position a token resumes after; raises ValueError when malformed"""
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+            return str(payload['created_at']), int(payload['rowid'])
+        except Exception:
+            raise ValueError('Invalid resume token')
+    
+    def filters(self) -> tuple:
+        conditions = []
+        params = []
+        if self.partner_type:
+            conditions.append('partner_type = ?')
+            params.append(self.partner_type)
+        if self.since:
+            conditions.append('created_at >= ?')
+            params.append(self.since)
+        if self.until:
+            conditions.append('created_at < ?')
+            params.append(self.until)
+        if self.after:
+            conditions.append('(created_at, rowid) > (?, ?)')
+            params.extend(self.after)
+        return conditions, params
+    
+    def high_water_mark(self, cursor) -> Optional[tuple]:
+        """Position of the last row this export will include"""
+        conditions, params = self.filters()
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        if self.limit:
+            cursor.execute(f'''
+                SELECT created_at, rowid FROM assessments {where}
+                ORDER BY created_at, rowid LIMIT 1 OFFSET ?
+            ''', (*params, self.limit - 1))
+            row = cursor.fetchone()
+            if row:
+                return row
+        cursor.execute(f'''
+            SELECT created_at, rowid FROM assessments {where}
+            ORDER BY created_at DESC, rowid DESC LIMIT 1
+        ''', params)
+        return cursor.fetchone()
+    
+    def open(self) -> Optional[str]:
+        """Fix the export range; returns the resume token for the next export"""
+        conn = sqlite3.connect('novascore.db')
+        try:
+            self.end = self.high_water_mark(conn.cursor())
+        finally:
+            conn.close()
+        if self.end:
+            return AssessmentExporter.encode_token(*self.end)
+        return AssessmentExporter.encode_token(*self.after) if self.after else None
+    
+    def chunks(self):
+        """Row chunks up to the high-water mark, straight from the cursor"""
+        if not self.end:
+            return
+        conditions, params = self.filters()
+        conditions.append('(created_at, rowid) <= (?, ?)')
+        params.extend(self.end)
+        
+        conn = sqlite3.connect('novascore.db')
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT {', '.join(name for name, _ in self.COLUMNS)}
+                FROM assessments
+                WHERE {' AND '.join(conditions)}
+                ORDER BY created_at, rowid
+            ''', params)
+            while True:
+                rows = cursor.fetchmany(self.CHUNK_SIZE)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+    
+    def iter_csv(self):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([name for name, _ in self.COLUMNS])
+        for rows in self.chunks():
+            writer.writerows(rows)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+    
+    def iter_parquet(self):
+        """One Parquet row group per cursor chunk"""
+        schema = pa.schema([(name, pa.type_for_alias(kind)) for name, kind in self.COLUMNS])
+        sink = StreamSink()
+        writer = pq.ParquetWriter(sink, schema, compression='gzip' if self.compress else 'snappy')
+        for rows in self.chunks():
+            columns = list(zip(*rows))
+            arrays = []
+            for (name, kind), values in zip(self.COLUMNS, columns):
+                if kind == 'bool':
+                    values = [None if value is None else bool(value) for value in values]
+                arrays.append(pa.array(values, type=schema.field(name).type))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+    
+    def stream(self):
+        """Response body chunks; CSV is gzipped as a whole when compression is requested"""
+        if self.fmt == 'parquet':
+            yield from self.iter_parquet()
+            return
+        if not self.compress:
+            yield from self.iter_csv()
+            return
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for data in self.iter_csv():
+            compressed = compressor.compress(data)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+    
+    def filename(self) -> str:
+        if self.fmt == 'csv' and self.compress:
+            return 'assessments.csv.gz'
+        return f'assessments.{self.fmt}'
+
+# ========================================================================================
+# DRIFT MONITORING
+# ========================================================================================
+
+class DriftSketch:
+    """Fixed-size, mergeable sketch of scored feature vectors
+    
+    Each feature gets a signed log-bucket histogram (relative accuracy GAMMA - 1) plus a NaN
+    count and a count of default-filled values; Nova Scores get a fixed 0-100 histogram per
+    partner type. Sketches with the same LAYOUT merge by adding counts.
+    """
+    
+    GAMMA = 1.1
+    MIN_MAGNITUDE = 1e-3
+    MAX_MAGNITUDE = 1e9
+    LOG_GAMMA = np.log(GAMMA)
+    # Buckets per sign; index HALF holds |value| < MIN_MAGNITUDE
+    HALF = int(np.ceil(np.log(MAX_MAGNITUDE / MIN_MAGNITUDE) / LOG_GAMMA))
+    N_BUCKETS = 2 * HALF + 1
+    SCORE_BINS = 20
+    LAYOUT = f"{FeatureStore.LAYOUT}:{GAMMA}:{MIN_MAGNITUDE}:{MAX_MAGNITUDE}:{SCORE_BINS}"
+    
+    N_FEATURES = len(FeatureStore.FEATURE_NAMES)
+    FEATURE_ROWS = np.arange(N_FEATURES)
+    MASK_SHIFTS = np.arange(N_FEATURES, dtype=np.int64)
+    
+    def __init__(self):
+        self.vectors = 0
+        self.counts = np.zeros((self.N_FEATURES, self.N_BUCKETS), dtype=np.int64)
+        self.nan_counts = np.zeros(self.N_FEATURES, dtype=np.int64)
+        self.default_filled = np.zeros(self.N_FEATURES, dtype=np.int64)
+        self.score_counts = {}
+    
+    @staticmethod
+    def bucket_index(values: np.ndarray) -> np.ndarray:
+        magnitude = np.abs(values)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k = np.floor(np.log(np.maximum(magnitude, DriftSketch.MIN_MAGNITUDE) / DriftSketch.MIN_MAGNITUDE) / DriftSketch.LOG_GAMMA)
+        k = np.clip(np.nan_to_num(k), 0, DriftSketch.HALF - 1).astype(np.int64)
+        return np.where(magnitude < DriftSketch.MIN_MAGNITUDE, DriftSketch.HALF,
+                        np.where(values > 0, DriftSketch.HALF + 1 + k, DriftSketch.HALF - 1 - k))
+    
+    @staticmethod
+    def bucket_values() -> np.ndarray:
+        """Representative value of every bucket"""
+        magnitudes = DriftSketch.MIN_MAGNITUDE * DriftSketch.GAMMA ** (np.arange(DriftSketch.HALF) + 0.5)
+        return np.concatenate([-magnitudes[::-1], [0.0], magnitudes])
+    
+    def add_matrix(self, features: np.ndarray, provided_masks: np.ndarray, partner_types: np.ndarray,
+                   nova_scores: np.ndarray):
+        """Fold a block of scored vectors in with one bincount per sketch component"""
+        nan = np.isnan(features)
+        self.nan_counts += nan.sum(axis=0)
+        flat = self.FEATURE_ROWS[None, :] * self.N_BUCKETS + self.bucket_index(np.where(nan, 0.0, features))
+        self.counts += np.bincount(flat[~nan], minlength=self.counts.size).reshape(self.counts.shape)
+        provided = (np.asarray(provided_masks, dtype=np.int64)[:, None] >> self.MASK_SHIFTS[None, :]) & 1
+        self.default_filled += len(features) - provided.sum(axis=0)
+        
+        score_bins = np.minimum((np.asarray(nova_scores) * self.SCORE_BINS / 100).astype(np.int64), self.SCORE_BINS - 1)
+        partner_types = np.asarray(partner_types, dtype=object)
+        for partner_type in pd.unique(partner_types):
+            counts = self.score_counts.setdefault(str(partner_type), np.zeros(self.SCORE_BINS, dtype=np.int64))
+            counts += np.bincount(score_bins[partner_types == partner_type], minlength=self.SCORE_BINS)
+        self.vectors += len(features)
+    
+    def merge(self, other: 'DriftSketch'):
+        self.vectors += other.vectors
+        self.counts += other.counts
+        self.nan_counts += other.nan_counts
+        self.default_filled += other.default_filled
+        for partner_type, counts in other.score_counts.items():
+            self.score_counts[partner_type] = self.score_counts.get(partner_type, 0) + counts
+    
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        score_types = list(self.score_counts)
+        np.savez_compressed(
+            buffer, vectors=np.array(self.vectors), counts=self.counts, nan_counts=self.nan_counts,
+            default_filled=self.default_filled, score_types=np.array(score_types, dtype=str),
+            score_counts=np.array([self.score_counts[t] for t in score_types], dtype=np.int64).reshape(-1, self.SCORE_BINS)
+        )
+        return buffer.getvalue()
+    
+    @staticmethod
+    def from_bytes(data: bytes) -> 'DriftSketch':
+        sketch = DriftSketch()
+        with np.load(io.BytesIO(data)) as stored:
+            sketch.vectors = int(stored['vectors'])
+            sketch.counts = stored['counts']
+            sketch.nan_counts = stored['nan_counts']
+            sketch.default_filled = stored['default_filled']
+            sketch.score_counts = dict(zip(stored['score_types'].tolist(), stored['score_counts']))
+        return sketch
+    
+    @staticmethod
+    def quantiles(counts: np.ndarray, values: np.ndarray, probabilities: List[float]) -> List[Optional[float]]:
+        total = counts.sum()
+        if not total:
+            return [None] * len(probabilities)
+        cumulative = np.cumsum(counts)
+        positions = np.searchsorted(cumulative, np.array(probabilities) * total, side='left')
+        return [round(float(values[min(i, len(values) - 1)]), 4) for i in positions]
+    
+    @staticmethod
+    def psi(baseline: np.ndarray, current: np.ndarray, n_bins: int = 10) -> Optional[float]:
+        """Population stability index over ~n_bins equal-mass bins of the baseline"""
+        if not baseline.sum() or not current.sum():
+            return None
+        cumulative = np.cumsum(baseline)
+        cuts = np.searchsorted(cumulative, cumulative[-1] * np.arange(1, n_bins) / n_bins, side='left') + 1
+        starts = np.unique(np.r_[0, cuts[cuts < len(baseline)]])
+        expected = np.add.reduceat(baseline, starts) / baseline.sum()
+        actual = np.add.reduceat(current, starts) / current.sum()
+        expected = np.maximum(expected, 1e-4)
+        actual = np.maximum(actual, 1e-4)
+        return round(float(np.sum((actual - expected) * np.log(actual / expected))), 4)
+
+class DriftMonitor:
+    """Process-wide drift sketch, snapshotted to SQLite as deltas so processes merge by summing
+    
+    Single request vectors are only appended to a short buffer and folded into the sketch
+    BUFFER_SIZE at a time, which keeps the per-request cost to a list append.
+    """
+    
+    BUFFER_SIZE = 256
+    ENABLED = os.environ.get('DRIFT_MONITORING_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    SNAPSHOT_SECONDS = float(os.environ.get('DRIFT_SNAPSHOT_SECONDS', '300'))
+    WINDOW_HOURS = float(os.environ.get('DRIFT_WINDOW_HOURS', '24'))
+    PSI_ALERT = float(os.environ.get('DRIFT_PSI_ALERT', '0.2'))
+    QUANTILES = [0.5, 0.9, 0.99]
+    
+    def __init__(self):
+        self.enabled = self.ENABLED
+        self.sketch = DriftSketch()
+        self.pending = []
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.writer = None
+    
+    def start(self):
+        if not self.enabled:
+            return
+        self.writer = threading.Thread(target=self.run, name='drift-snapshots', daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+    
+    def observe_vector(self, vector: np.ndarray, provided_mask: int, partner_type: str, nova_score: float):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.pending.append((vector, provided_mask, partner_type, nova_score))
+            if len(self.pending) >= self.BUFFER_SIZE:
+                self.fold_pending()
+    
+    def fold_pending(self):
+        """Move buffered vectors into the sketch (caller holds the lock)"""
+        if not self.pending:
+            return
+        vectors, masks, partner_types, nova_scores = zip(*self.pending)
+        self.pending = []
+        self.sketch.add_matrix(
+            np.vstack(vectors).astype(float),
+            np.array(masks, dtype=np.int64),
+            np.array(partner_types, dtype=object),
+            np.array(nova_scores, dtype=float)
+        )
+    
+    def observe_matrix(self, features: np.ndarray, provided_masks: np.ndarray, partner_types: np.ndarray,
+                       nova_scores: np.ndarray):
+        if not self.enabled or not len(features):
+            return
+        with self.lock:
+            self.sketch.add_matrix(features, provided_masks, partner_types, nova_scores)
+    
+    def flush(self):
+        """Persist the counts gathered since the last snapshot and start a fresh delta"""
+        with self.lock:
+            self.fold_pending()
+            sketch, self.sketch = self.sketch, DriftSketch()
+        if not sketch.vectors:
+            return
+        try:
+            DriftMonitor.save(sketch, 'window')
+        except sqlite3.Error as e:
+            logger.warning(f"Drift snapshot failed, keeping counts in memory: {str(e)}")
+            with self.lock:
+                self.sketch.merge(sketch)
+    
+    def run(self):
+        while not self.stopping.wait(self.SNAPSHOT_SECONDS):
+            self.flush()
+    
+    def close(self):
+        self.stopping.set()
+        self.flush()
+    
+    @staticmethod
+    def save(sketch: DriftSketch, kind: str):
+        conn = sqlite3.connect('novascore.db', timeout=30)
+        try:
+            conn.execute('INSERT INTO drift_snapshots (kind, sketch_layout, vectors, state) VALUES (?, ?, ?, ?)',
+                         (kind, DriftSketch.LAYOUT, sketch.vectors, sketch.to_bytes()))
+            conn.commit()
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def load_baseline() -> Optional[tuple]:
+        """(created_at, sketch) of the latest baseline"""
+        conn = sqlite3.connect('novascore.db')
+        row = conn.execute('''
+            SELECT created_at, state FROM drift_snapshots
+            WHERE kind = 'baseline' AND sketch_layout = ?
+            ORDER BY id DESC LIMIT 1
+        ''', (DriftSketch.LAYOUT,)).fetchone()
+        conn.close()
+        return (row[0], DriftSketch.from_bytes(row[1])) if row else None
+    
+    def window(self, since: str) -> DriftSketch:
+        """Merged snapshots since a timestamp, plus this process's unsaved counts"""
+        merged = DriftSketch()
+        conn = sqlite3.connect('novascore.db')
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT state FROM drift_snapshots
+            WHERE kind = 'window' AND sketch_layout = ? AND created_at >= ?
+        ''', (DriftSketch.LAYOUT, since))
+        for (state,) in cursor:
+            merged.merge(DriftSketch.from_bytes(state))
+        conn.close()
+        with self.lock:
+            self.fold_pending()
+            merged.merge(self.sketch)
+        return merged
+    
+    @staticmethod
+    def build_baseline(since: str = None, until: str = None) -> DriftSketch:
+        """Baseline sketch from stored feature vectors and scores"""
+        conditions = ['f.feature_layout = ?']
+        params = [FeatureStore.LAYOUT]
+        if since:
+            conditions.append('a.created_at >= ?')
+            params.append(since)
+        if until:
+            conditions.append('a.created_at < ?')
+            params.append(until)
+        
+        sketch = DriftSketch()
+        conn = sqlite3.connect('novascore.db')
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT f.features, f.provided_mask, a.partner_type, a.nova_score
+            FROM assessment_features f
+            JOIN assessments a ON a.id = f.assessment_id
+            WHERE {' AND '.join(conditions)}
+        ''', params)
+        while True:
+            rows = cursor.fetchmany(20000)
+            if not rows:
+                break
+            sketch.add_matrix(
+                FeatureStore.unpack([row[0] for row in rows]),
+                np.array([row[1] for row in rows], dtype=np.int64),
+                np.array([row[2] for row in rows], dtype=object),
+                np.array([row[3] or 0 for row in rows], dtype=float)
+            )
+        conn.close()
+        return sketch
+    
+    def report(self, since: str = None) -> Dict[str, Any]:
+        """Window vs baseline: per-feature PSI, quantiles and default-fill rates, and score PSI per partner type"""
+        since = since or (datetime.utcnow() - timedelta(hours=self.WINDOW_HOURS)).strftime('%Y-%m-%d %H:%M:%S')
+        current = self.window(since)
+        stored = DriftMonitor.load_baseline()
+        baseline = stored[1] if stored else None
+        values = DriftSketch.bucket_values()
+        
+        def rate(count, total):
+            return round(float(count) / total, 4) if total else None
+        
+        features = {}
+        for i, name in enumerate(FeatureStore.FEATURE_NAMES):
+            current_counts = np.r_[current.counts[i], current.nan_counts[i]]
+            feature = {
+                'psi': None,
+                'quantiles': dict(zip(map(str, self.QUANTILES), DriftSketch.quantiles(current.counts[i], values, self.QUANTILES))),
+                'default_fill_rate': rate(current.default_filled[i], current.vectors),
+                'nan_rate': rate(current.nan_counts[i], current.vectors)
+            }
+            if baseline:
+                feature['psi'] = DriftSketch.psi(np.r_[baseline.counts[i], baseline.nan_counts[i]], current_counts)
+                feature['baseline_quantiles'] = dict(zip(map(str, self.QUANTILES), DriftSketch.quantiles(baseline.counts[i], values, self.QUANTILES)))
+                feature['baseline_default_fill_rate'] = rate(baseline.default_filled[i], baseline.vectors)
+            features[name] = feature
+        
+        score_values = (np.arange(DriftSketch.SCORE_BINS) + 0.5) * 100 / DriftSketch.SCORE_BINS
+        scores = {}
+        for partner_type in sorted(set(current.score_counts) | set(baseline.score_counts if baseline else [])):
+            counts = current.score_counts.get(partner_type, np.zeros(DriftSketch.SCORE_BINS, dtype=np.int64))
+            base_counts = baseline.score_counts.get(partner_type) if baseline else None
+            scores[partner_type] = {
+                'count': int(counts.sum()),
+                'histogram': counts.tolist(),
+                'quantiles': dict(zip(map(str, self.QUANTILES), DriftSketch.quantiles(counts, score_values, self.QUANTILES))),
+                'psi': DriftSketch.psi(base_counts, counts) if base_counts is not None else None
+            }
+        
+        return {
+            'window': {'since': since, 'vectors': current.vectors},
+            'baseline': {'created_at': stored[0], 'vectors': baseline.vectors} if stored else None,
+            'psi_alert_threshold': self.PSI_ALERT,
+            'drifted_features': [name for name, feature in features.items()
+                                 if feature['psi'] is not None and feature['psi'] >= self.PSI_ALERT],
+            'features': features,
+            'scores': scores
+        }
+
+drift_monitor = DriftMonitor()
+drift_monitor.start()
 
 # ========================================================================================
-# DATABASE OPERATIONS
+# DATA RETENTION
 # ========================================================================================
 
-def save_assessment(assessment_data: Dict[str, Any]) -> str:
-    """Save assessment to database"""
-    conn = sqlite3.connect('novascore.db')
-    cursor = conn.cursor()
+class AssessmentArchiver:
+    """Moves assessments older than the retention period into per-month archive databases
     
-    assessment_id = str(uuid.uuid4())
+    Rows are copied into archive/assessments-YYYY-MM.db and committed there first, then
+    folded into assessment_rollups and deleted from the live table in one transaction, a
+    chunk at a time. A run interrupted between the two steps is finished by the next one.
+    The freed pages are returned incrementally and the planner statistics refreshed, so the
+    live database stays at roughly RETENTION_DAYS of traffic. The one-off conversion to
+    incremental auto-vacuum rewrites the whole file, so only `flask archive` performs it.
+    """
     
-    cursor.execute('''
-        INSERT INTO assessments (
-            id, partner_type, partner_name, monthly_earning, yearly_earning,
-            customer_rating, active_days, working_tenure_ingrab, nova_score,
-            loan_approved, loan_amount, interest_rate, risk_category, additional_data
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        assessment_id,
-        assessment_data['partner_type'],
-        assessment_data['partner_name'],
-        assessment_data['monthly_earning'],
-        assessment_data['yearly_earning'],
-        assessment_data['customer_rating'],
-        assessment_data['active_days'],
-        assessment_data['working_tenure_ingrab'],
-        assessment_data['nova_score'],
-        assessment_data['loan_approved'],
-        assessment_data['loan_amount'],
-        assessment_data['interest_rate'],
-        assessment_data['risk_category'],
-        json.dumps(assessment_data.get('additional_data', {}))
-    ))
+    RETENTION_DAYS = float(os.environ.get('RETENTION_DAYS', '0'))
+    ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', 'archive')
+    BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', '5000'))
+    INTERVAL_HOURS = float(os.environ.get('RETENTION_INTERVAL_HOURS', '24'))
+    VACUUM_PAGES = int(os.environ.get('RETENTION_VACUUM_PAGES', '2000'))
     
-    conn.commit()
-    conn.close()
+    # Archived tables, as (table, key column)
+    TABLES = [('assessments', 'id'), ('assessment_features', 'assessment_id')]
     
-    return assessment_id
+    ROLLUP_SQL = '''
+        INSERT INTO assessment_rollups (day, partner_type, risk_category, assessments, approved, nova_score_sum)
+        SELECT DATE(created_at), partner_type, risk_category, COUNT(*), SUM(loan_approved = 1), TOTAL(nova_score)
+        FROM assessments
+        WHERE id IN (SELECT id FROM temp.archive_batch)
+        GROUP BY DATE(created_at), partner_type, risk_category
+        ON CONFLICT (day, partner_type, risk_category) DO UPDATE SET
+            assessments = assessments + excluded.assessments,
+            approved = approved + excluded.approved,
+            nova_score_sum = nova_score_sum + excluded.nova_score_sum
+    '''
+    
+    def __init__(self, retention_days: float = None, batch_size: int = None, dry_run: bool = False,
+                 convert: bool = False):
+        self.retention_days = self.RETENTION_DAYS if retention_days is None else retention_days
+        # Never archive rows idempotent replays may still need
+        self.retention_days = max(self.retention_days, IDEMPOTENCY_WINDOW_SECONDS / 86400)
+        self.batch_size = max(1, batch_size or self.BATCH_SIZE)
+        self.dry_run = dry_run
+        self.convert = convert
+        self.stopping = threading.Event()
+        self.worker = None
+    
+    def start(self):
+        if self.RETENTION_DAYS <= 0 or self.INTERVAL_HOURS <= 0:
+            return
+        self.worker = threading.Thread(target=self.loop, name='retention', daemon=True)
+        self.worker.start()
+        atexit.register(self.stopping.set)
+    
+    def loop(self):
+        while not self.stopping.wait(self.INTERVAL_HOURS * 3600):
+            try:
+                self.run()
+            except sqlite3.Error as e:
+                logger.warning(f"Archival run failed, retrying next interval: {str(e)}")
+    
+    @classmethod
+    def archive_path(cls, month: str) -> str:
+        return os.path.join(cls.ARCHIVE_DIR, f'assessments-{month}.db')
+    
+    @classmethod
+    def ensure_archive_schema(cls, conn: sqlite3.Connection):
+        """Create the attached archive's tables, adding columns the live tables gained since"""
+        for table, key in cls.TABLES:
+            conn.execute(f'CREATE TABLE IF NOT EXISTS archive.{table} AS SELECT * FROM main.{table} WHERE 0')
+            conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS archive.idx_{table}_{key} ON {table} ({key})')
+            archived = {row[1] for row in conn.execute(f'PRAGMA archive.table_info({table})')}
+            for row in conn.execute(f'PRAGMA main.table_info({table})').fetchall():
+                if row[1] not in archived:
+                    conn.execute(f'ALTER TABLE archive.{table} ADD COLUMN {row[1]} {row[2]}')
+        conn.execute('CREATE INDEX IF NOT EXISTS archive.idx_assessments_created_at ON assessments (created_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS archive.idx_assessments_partner_key ON assessments (partner_key, created_at)')
+    
+    @staticmethod
+    def columns(conn: sqlite3.Connection, table: str) -> str:
+        return ', '.join(row[1] for row in conn.execute(f'PRAGMA main.table_info({table})').fetchall())
+    
+    def cutoff(self, conn: sqlite3.Connection) -> str:
+        return conn.execute("SELECT datetime('now', ?)", (f'-{self.retention_days * 86400:.0f} seconds',)).fetchone()[0]
+    
+    def archive_batch(self, conn: sqlite3.Connection, month: str) -> int:
+        """Copy temp.archive_batch into the month's archive, then roll it up and delete it from the live table"""
+        os.makedirs(self.ARCHIVE_DIR, exist_ok=True)
+        conn.execute('ATTACH DATABASE ? AS archive', (self.archive_path(month),))
+        try:
+            self.ensure_archive_schema(conn)
+            conn.execute('BEGIN')
+            for table, key in self.TABLES:
+                columns = self.columns(conn, table)
+                conn.execute(f'''
+                    INSERT OR IGNORE INTO archive.{table} ({columns})
+                    SELECT {columns} FROM main.{table}
+                    WHERE {key} IN (SELECT id FROM temp.archive_batch)
+                ''')
+            conn.execute('COMMIT')
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.execute('DETACH DATABASE archive')
+        
+        # Only rows still present are rolled up, so concurrent or repeated runs never count twice
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(self.ROLLUP_SQL)
+            conn.execute('''
+                INSERT OR IGNORE INTO partner_archive_months (partner_key, month)
+                SELECT DISTINCT partner_key, ? FROM assessments
+                WHERE id IN (SELECT id FROM temp.archive_batch) AND partner_key IS NOT NULL
+            ''', (month,))
+            conn.execute('DELETE FROM assessment_features WHERE assessment_id IN (SELECT id FROM temp.archive_batch)')
+            moved = conn.execute('DELETE FROM assessments WHERE id IN (SELECT id FROM temp.archive_batch)').rowcount
+            conn.execute('COMMIT')
+        except sqlite3.Error:
+            conn.execute('ROLLBACK')
+            raise
+        return moved
+    
+    def compact(self, conn: sqlite3.Connection) -> int:
+        """Return up to VACUUM_PAGES free pages to the filesystem and refresh planner statistics"""
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            if self.convert:
+                # One-off conversion of databases created before incremental vacuum was enabled
+                logger.info("Converting database to incremental auto-vacuum")
+                conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+                conn.execute('VACUUM')
+            else:
+                logger.warning("Database is not in incremental auto-vacuum mode; run `flask archive` once to convert it")
+        free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        conn.execute(f'PRAGMA incremental_vacuum({self.VACUUM_PAGES})').fetchall()
+        conn.execute('PRAGMA analysis_limit=1000')
+        conn.execute('PRAGMA optimize')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        return free_pages - conn.execute('PRAGMA freelist_count').fetchone()[0]
+    
+    def run(self) -> Dict[str, Any]:
+        started = time.time()
+        conn = sqlite3.connect('novascore.db', timeout=30, isolation_level=None)
+        try:
+            cutoff = self.cutoff(conn)
+            report = {'cutoff': cutoff, 'dry_run': self.dry_run, 'archived': 0, 'months': {}}
+            
+            if self.dry_run:
+                cursor = conn.execute('''
+                    SELECT strftime('%Y-%m', created_at), COUNT(*) FROM assessments
+                    WHERE created_at < ? GROUP BY 1 ORDER BY 1
+                ''', (cutoff,))
+                report['months'] = dict(cursor.fetchall())
+                report['archived'] = sum(report['months'].values())
+                return report
+            
+            conn.execute('CREATE TEMP TABLE IF NOT EXISTS archive_batch (id TEXT PRIMARY KEY)')
+            while not self.stopping.is_set():
+                oldest = conn.execute('SELECT MIN(created_at) FROM assessments WHERE created_at < ?', (cutoff,)).fetchone()[0]
+                if oldest is None:
+                    break
+                month = oldest[:7]
+                month_end = conn.execute("SELECT date(?, 'start of month', '+1 month')", (oldest,)).fetchone()[0]
+                conn.execute('DELETE FROM temp.archive_batch')
+                conn.execute('''
+                    INSERT INTO temp.archive_batch (id)
+                    SELECT id FROM assessments
+                    WHERE created_at >= ? AND created_at < ?
+                    ORDER BY created_at
+                    LIMIT ?
+                ''', (oldest, min(cutoff, month_end), self.batch_size))
+                moved = self.archive_batch(conn, month)
+                if not moved:
+                    break
+                report['months'][month] = report['months'].get(month, 0) + moved
+                report['archived'] += moved
+            
+            # Drift windows older than the retention period are never read again; baselines are kept
+            report['drift_snapshots_deleted'] = conn.execute(
+                "DELETE FROM drift_snapshots WHERE kind = 'window' AND created_at < ?", (cutoff,)
+            ).rowcount
+            report['pages_freed'] = self.compact(conn)
+        finally:
+            conn.close()
+        
+        report['elapsed_seconds'] = round(time.time() - started, 2)
+        logger.info(f"Archived {report['archived']} assessments older than {cutoff} "
+                    f"into {len(report['months'])} monthly archives")
+        return report
+    
+    @classmethod
+    def partner_timeline(cls, partner_key: str, since: str = None, until: str = None,
+                         limit: int = 100) -> List[Dict[str, Any]]:
+        """Archived part of a partner timeline, newest first, attaching one month at a time"""
+        conditions, params = ['partner_key = ?'], [partner_key]
+        if since:
+            conditions.append('month >= ?')
+            params.append(since[:7])
+        if until:
+            conditions.append('month <= ?')
+            params.append(until[:7])
+        
+        results = []
+        conn = sqlite3.connect('novascore.db', uri=True)
+        try:
+            months = [row[0] for row in conn.execute(f'''
+                SELECT month FROM partner_archive_months
+                WHERE {' AND '.join(conditions)}
+                ORDER BY month DESC
+            ''', params)]
+            for month in months:
+                if len(results) >= limit:
+                    break
+                
+                conditions, params = ['partner_key = ?'], [partner_key]
+                if since:
+                    conditions.append('created_at >= ?')
+                    params.append(since)
+                if until:
+                    conditions.append('created_at < ?')
+                    params.append(until)
+                params.append(limit - len(results))
+                
+                conn.execute('ATTACH DATABASE ? AS archive', (f'file:{cls.archive_path(month)}?mode=ro',))
+                try:
+                    cursor = conn.execute(f'''
+                        SELECT id AS assessment_id, created_at, nova_score, risk_category,
+                               loan_approved, loan_amount, interest_rate, model_version
+                        FROM archive.assessments
+                        WHERE {' AND '.join(conditions)}
+                        ORDER BY created_at DESC
+                        LIMIT ?
+                    ''', params)
+                    columns = [description[0] for description in cursor.description]
+                    results.extend(dict(zip(columns, row)) for row in cursor.fetchall())
+                finally:
+                    conn.execute('DETACH DATABASE archive')
+        finally:
+            conn.close()
+        return results
 
-def get_assessment_history(limit: int = 100) -> List[Dict[str, Any]]:
-    """Get assessment history from database"""
-    conn = sqlite3.connect('novascore.db')
-    cursor = conn.cursor()
+@app.cli.command('archive')
+@click.option('--days', type=float, default=None, help='Retention period in days (default RETENTION_DAYS)')
+@click.option('--batch-size', type=int, default=None, help='Rows moved per transaction (default ARCHIVE_BATCH_SIZE)')
+@click.option('--dry-run', is_flag=True, help='Report what would be archived without moving anything')
+def archive_command(days, batch_size, dry_run):
+    """Move assessments older than the retention period into monthly archive databases"""
+    days = AssessmentArchiver.RETENTION_DAYS if days is None else days
+    if days <= 0:
+        raise click.UsageError('Set RETENTION_DAYS or pass --days')
+    report = AssessmentArchiver(days, batch_size, dry_run, convert=True).run()
+    click.echo(json.dumps(report, indent=2))
+
+# Scheduled archival (runs only when RETENTION_DAYS is set)
+retention = AssessmentArchiver()
+retention.start()
+
+# ========================================================================================
+# WRITE-BEHIND PERSISTENCE
+# ========================================================================================
+
+class WriteBehindFullError(Exception):
+    """Raised when the write-behind queue stays full past the enqueue timeout"""
+    pass
+
+class WriteBehindQueue:
+    """Bounded in-memory queue drained by a single writer thread in group-committed transactions
+
+    Every accepted row is first appended to an optional local journal, one file per process
+    (WRITE_BEHIND_JOURNAL.<pid>); rows are inserted with INSERT OR IGNORE so replaying the
+    journals of stopped processes at startup is idempotent. After every committed batch the
+    journal is compacted to the rows still waiting in the queue. A batch that fails
+    for any reason other than a busy database is retried row by row, and rows that still
+    fail (or a batch still locked after MAX_RETRIES) go to the dead-letter file.
+    """
     
-    cursor.execute('''
-        SELECT * FROM assessments 
-        ORDER BY created_at DESC 
-        LIMIT ?
-    ''', (limit,))
+    MAX_RETRIES = int(os.environ.get('WRITE_BEHIND_MAX_RETRIES', 20))
+
+    def __init__(self):
+        self.enabled = os.environ.get('WRITE_BEHIND_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+        self.capacity = int(os.environ.get('WRITE_BEHIND_QUEUE_SIZE', 1000))
+        self.enqueue_timeout = float(os.environ.get('WRITE_BEHIND_ENQUEUE_TIMEOUT_SECONDS', 1.0))
+        self.batch_size = int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', 500))
+        self.journal_path = os.environ.get('WRITE_BEHIND_JOURNAL', 'assessments.journal')
+        self.dead_letter_path = os.environ.get('WRITE_BEHIND_DEAD_LETTER', 'assessments.deadletter')
+        self.fsync = os.environ.get('WRITE_BEHIND_FSYNC', 'false').lower() in ('1', 'true', 'yes')
+
+        self.rows = queue.Queue()
+        self.slots = threading.BoundedSemaphore(self.capacity)
+        self.lock = threading.Lock()
+        self.drained = threading.Condition(self.lock)
+        self.pending = 0
+        self.counters = {'accepted': 0, 'committed': 0, 'rejected_full': 0, 'commit_retries': 0, 'replayed': 0,
+                         'dead_lettered': 0}
+        self.journal = None
+        self.journal_file = None
+        self.journal_entries = {}
+        self.stopping = threading.Event()
+        self.writer = None
+
+    def start(self):
+        """Replay any journal left by a previous run, then start the writer thread"""
+        if not self.enabled:
+            return
+        if self.journal_path:
+            self.journal_file = f'{self.journal_path}.{os.getpid()}'
+            self.replay_journals()
+            self.journal = open(self.journal_file, 'a', encoding='utf-8')
+        self.writer = threading.Thread(target=self.run, name='write-behind', daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+        logger.info(f"Write-behind persistence enabled (queue size {self.capacity}, journal: {self.journal_file or 'off'})")
+
+    @staticmethod
+    def is_stopped(pid: int) -> bool:
+        """Whether the process that owned a journal is gone (our own pid means a previous run)"""
+        if pid == os.getpid():
+            return True
+        if os.name != 'posix':
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            return False
+        return False
+
+    def orphaned_journals(self) -> List[str]:
+        """Journals left by stopped processes, our own interrupted replay first"""
+        # Single-file journal written before journals were per process
+        paths = [self.journal_path] if os.path.isfile(self.journal_path) else []
+        for path in glob.glob(glob.escape(self.journal_path) + '.*'):
+            owner = path[len(self.journal_path) + 1:].split('.')[0]
+            if not owner.isdigit() or not self.is_stopped(int(owner)):
+                continue
+            if path.endswith('.tmp'):
+                # Compaction interrupted before it replaced the journal, which is still intact
+                os.remove(path)
+            else:
+                paths.append(path)
+        return sorted(paths, key=lambda path: (not path.endswith('.replay'), path))
+
+    def replay_journals(self):
+        """Commit the rows of every orphaned journal, claiming each so only one process replays it"""
+        claimed = f'{self.journal_file}.replay'
+        for path in self.orphaned_journals():
+            if path != claimed:
+                try:
+                    os.replace(path, claimed)
+                except FileNotFoundError:
+                    # Claimed by another process starting at the same time
+                    continue
+            self.replay_journal(claimed)
+            os.remove(claimed)
+
+    def replay_journal(self, path: str):
+        rows = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    # Entries journaled before feature storage are bare rows
+                    row, feature_row = entry if isinstance(entry[0], list) else (entry, None)
+                    # Rows journaled before later columns existed leave them NULL
+                    row = row + [None] * (INSERT_ASSESSMENT_SQL.count('?') - len(row))
+                    if feature_row:
+                        feature_row[2] = bytes.fromhex(feature_row[2])
+                    rows.append((tuple(row), tuple(feature_row) if feature_row else None))
+                except (json.JSONDecodeError, ValueError, TypeError, IndexError):
+                    # A torn final line from a crash mid-append was never acknowledged
+                    logger.warning("Skipping unreadable write-behind journal entry")
+        if rows:
+            committed = self.commit(rows)
+            self.counters['replayed'] += committed
+            logger.info(f"Replayed {committed} assessments from write-behind journal")
+
+    def submit(self, row: tuple, feature_row: Optional[tuple] = None):
+        """Accept a row for asynchronous insertion, blocking up to the enqueue timeout when full"""
+        if not self.slots.acquire(timeout=self.enqueue_timeout):
+            with self.lock:
+                self.counters['rejected_full'] += 1
+            raise WriteBehindFullError('Assessment write queue is full')
+        with self.lock:
+            if self.journal:
+                journal_features = None
+                if feature_row:
+                    journal_features = list(feature_row)
+                    journal_features[2] = feature_row[2].hex()
+                try:
+                    entry = json.dumps([row, journal_features]) + '\n'
+                except (TypeError, ValueError):
+                    self.slots.release()
+                    raise
+                self.journal.write(entry)
+                self.journal.flush()
+                if self.fsync:
+                    os.fsync(self.journal.fileno())
+                self.journal_entries[row[0]] = entry
+            self.pending += 1
+            self.counters['accepted'] += 1
+        self.rows.put((row, feature_row))
+
+    @staticmethod
+    def insert(rows: List[tuple]):
+        conn = sqlite3.connect('novascore.db', timeout=30)
+        try:
+            conn.executemany(INSERT_OR_IGNORE_ASSESSMENT_SQL, [row for row, _ in rows])
+            conn.executemany(FeatureStore.INSERT_OR_IGNORE_SQL,
+                             [feature_row for _, feature_row in rows if feature_row])
+            conn.commit()
+        finally:
+            conn.close()
     
-    columns = [description[0] for description in cursor.description]
-    results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    def commit(self, rows: List[tuple]) -> int:
+        """Insert (row, feature_row) pairs in one transaction; returns how many were not dead-lettered"""
+        delay = 0.05
+        for attempt in range(self.MAX_RETRIES + 1):
+            try:
+                self.insert(rows)
+                return len(rows)
+            except sqlite3.OperationalError as e:
+                # Busy or locked database: back off and retry the whole batch
+                error = e
+                if attempt < self.MAX_RETRIES:
+                    logger.warning(f"Write-behind commit failed, retrying: {str(e)}")
+                    with self.lock:
+                        self.counters['commit_retries'] += 1
+                    time.sleep(delay)
+                    delay = min(delay * 2, 2.0)
+            except (sqlite3.Error, ValueError, TypeError, OverflowError) as e:
+                # A row that cannot be bound or inserted: isolate it from the rest of the batch
+                if len(rows) > 1:
+                    return sum(self.commit([pair]) for pair in rows)
+                error = e
+                break
+        self.dead_letter(rows, error)
+        return 0
     
-    conn.close()
-    return results
+    def dead_letter(self, rows: List[tuple], error: Exception):
+        """Set rows that could not be committed aside in the dead-letter file"""
+        logger.error(f"Moving {len(rows)} assessment(s) to write-behind dead letters ({type(error).__name__}: {str(error)}): "
+                     f"{', '.join(str(row[0]) for row, _ in rows)}")
+        with self.lock:
+            self.counters['dead_lettered'] += len(rows)
+        if not self.dead_letter_path:
+            return
+        with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+            for row, feature_row in rows:
+                journal_features = None
+                if feature_row:
+                    journal_features = list(feature_row)
+                    journal_features[2] = bytes(feature_row[2]).hex()
+                f.write(json.dumps({'row': row, 'features': journal_features,
+                                    'error': f'{type(error).__name__}: {str(error)}'}, default=repr) + '\n')
 
-def get_dashboard_stats() -> Dict[str, Any]:
-    """Get dashboard statistics"""
-    conn = sqlite3.connect('novascore.db')
-    cursor = conn.cursor()
+    def run(self):
+        while not (self.stopping.is_set() and self.rows.empty()):
+            try:
+                batch = [self.rows.get(timeout=0.2)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.rows.get_nowait())
+                except queue.Empty:
+                    break
+
+            committed = self.commit(batch)
+            for _ in batch:
+                self.slots.release()
+
+            with self.lock:
+                self.pending -= len(batch)
+                self.counters['committed'] += committed
+                if self.journal:
+                    for row, _ in batch:
+                        self.journal_entries.pop(row[0], None)
+                    self.compact_journal()
+                if self.pending == 0:
+                    self.drained.notify_all()
+
+    def compact_journal(self):
+        """Rewrite the journal with only the rows still queued (called holding the lock)"""
+        if not self.journal_entries:
+            self.journal.truncate(0)
+            self.journal.seek(0)
+            return
+        temp_path = f'{self.journal_file}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.writelines(self.journal_entries.values())
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        self.journal.close()
+        os.replace(temp_path, self.journal_file)
+        self.journal = open(self.journal_file, 'a', encoding='utf-8')
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until every accepted row is committed"""
+        with self.lock:
+            return self.drained.wait_for(lambda: self.pending == 0, timeout=timeout)
+
+    def close(self):
+        """Drain the queue and stop the writer (registered to run at shutdown)"""
+        if not self.writer or not self.writer.is_alive():
+            return
+        self.stopping.set()
+        self.writer.join()
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+            if not self.journal_entries:
+                os.remove(self.journal_file)
+        logger.info("Write-behind queue flushed")
+
+    def get_status(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'enabled': self.enabled,
+                'queue_depth': self.pending,
+                'capacity': self.capacity,
+                'journal': self.journal_file,
+                'counters': dict(self.counters)
+            }
+
+write_behind = WriteBehindQueue()
+write_behind.start()
+
+# ========================================================================================
+# RESPONSE ENCODING
+# ========================================================================================
+
+def encode_fallback(value: Any) -> Any:
+    """Serialize NumPy values and anything the default Flask JSON provider handles"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return DefaultJSONProvider.default(value)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify through orjson when it is installed, honoring sort_keys and debug indentation"""
     
-    # Total assessments
-    cursor.execute('SELECT COUNT(*) FROM assessments')
-    total_assessments = cursor.fetchone()[0]
+    default = staticmethod(encode_fallback)
     
-    # Approval rate
-    cursor.execute('SELECT COUNT(*) FROM assessments WHERE loan_approved = 1')
-    approved_count = cursor.fetchone()[0]
-    approval_rate = (approved_count / max(total_assessments, 1)) * 100
+    def options(self) -> int:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return option
     
-    # Average Nova Score
-    cursor.execute('SELECT AVG(nova_score) FROM assessments')
-    avg_nova_score = cursor.fetchone()[0] or 0
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.options()).decode('utf-8')
     
-    # Risk distribution
-    cursor.execute('''
-        SELECT risk_category, COUNT(*) 
-        FROM assessments 
-        GROUP BY risk_category
-    ''')
-    risk_distribution = dict(cursor.fetchall())
+    def response(self, *args: Any, **kwargs: Any):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.options()), mimetype=self.mimetype
+        )
+
+app.json = FastJSONProvider(app)
+
+MSGPACK_MIMETYPES = ['application/msgpack', 'application/x-msgpack']
+
+def to_columnar(rows: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Turn a list of row dicts into one list per column"""
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    return {column: [row.get(column) for row in rows] for column in columns}
+
+def tabular_response(payload: Dict[str, Any], table_key: str):
+    """jsonify for payloads carrying a list of rows
     
-    # Partner type distribution
-    cursor.execute('''
-        SELECT partner_type, COUNT(*) 
-        FROM assessments 
-        GROUP BY partner_type
-    ''')
-    partner_distribution = dict(cursor.fetchall())
+    `?shape=columnar` replaces the rows with column arrays, and an Accept header preferring
+    application/msgpack returns MessagePack instead of JSON.
+    """
+    if request.args.get('shape') == 'columnar':
+        payload = {**payload, table_key: to_columnar(payload[table_key]), 'shape': 'columnar'}
     
-    # Recent assessments trend (last 7 days)
-    cursor.execute('''
-        SELECT DATE(created_at) as date, COUNT(*) as count
-        FROM assessments 
-        WHERE created_at >= datetime('now', '-7 days')
-        GROUP BY DATE(created_at)
-        ORDER BY date
-    ''')
-    daily_assessments = [{'date': row[0], 'count': row[1]} for row in cursor.fetchall()]
+    if msgpack is not None:
+        best = request.accept_mimetypes.best_match(['application/json', *MSGPACK_MIMETYPES])
+        if best in MSGPACK_MIMETYPES:
+            response = app.response_class(msgpack.packb(payload, default=encode_fallback), mimetype=best)
+            response.vary.add('Accept')
+            return response
     
-    conn.close()
+    response = jsonify(payload)
+    response.vary.add('Accept')
+    return response
+
+class ResponseCompressor:
+    """gzip or brotli for buffered responses, negotiated from Accept-Encoding"""
     
-    return {
-        'total_assessments': total_assessments,
-        'approval_rate': round(approval_rate, 2),
-        'avg_nova_score': round(avg_nova_score, 2),
-        'risk_distribution': risk_distribution,
-        'partner_distribution': partner_distribution,
-        'daily_assessments': daily_assessments,
-        'model_info': {
-            'model_name': ml_loader.model_info['best_model_name'],
-            'features_count': len(ml_loader.model_info['feature_names'])
-        }
-    }
+    MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESS_MIN_BYTES', '1024'))
+    GZIP_LEVEL = int(os.environ.get('RESPONSE_GZIP_LEVEL', '6'))
+    BROTLI_QUALITY = int(os.environ.get('RESPONSE_BROTLI_QUALITY', '5'))
+    COMPRESSIBLE = {'application/json', 'text/csv', 'application/x-ndjson', 'text/plain', 'text/html', *MSGPACK_MIMETYPES}
+    
+    @staticmethod
+    def compress(response):
+        # Streams and files (send_file, exports) are passed through untouched
+        if (response.direct_passthrough or response.is_streamed or
+                'Content-Encoding' in response.headers or
+                response.mimetype not in ResponseCompressor.COMPRESSIBLE):
+            return response
+        response.vary.add('Accept-Encoding')
+        if (response.content_length or 0) < ResponseCompressor.MIN_BYTES:
+            return response
+        
+        encoding = request.accept_encodings.best_match((['br'] if brotli is not None else []) + ['gzip'])
+        if encoding == 'br':
+            response.set_data(brotli.compress(response.get_data(), quality=ResponseCompressor.BROTLI_QUALITY))
+        elif encoding == 'gzip':
+            response.set_data(gzip.compress(response.get_data(), compresslevel=ResponseCompressor.GZIP_LEVEL, mtime=0))
+        else:
+            return response
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+@app.after_request
+def compress_response(response):
+    return ResponseCompressor.compress(response)
 
 # ========================================================================================
 # ERROR HANDLERS
@@ -589,28 +3851,29 @@ def root():
 def get_partner_types():
     """Get available partner types"""
     return jsonify({
-        "partner_types": [
-            {
-                "id": "driver",
-                "name": "Driver",
-                "description": "Vehicle drivers for ride-sharing services",
-                "required_fields": ["total_trips", "vehicle_age", "trip_distance", "peak_hours_ratio"]
-            },
-            {
-                "id": "merchant",
-                "name": "Merchant",
-                "description": "Restaurant and store partners",
-                "required_fields": ["total_orders", "avg_ordervalue", "preparation_time", "menu_diversity", "consumer_retention_rate"]
-            },
-            {
-                "id": "delivery_partner",
-                "name": "Delivery Partner",
-                "description": "Food and package delivery partners",
-                "required_fields": ["total_deliveries", "avg_delivery_time", "delivery_success_rate", "batch_delivery_ratio"]
-            }
-        ]
+        "partner_types": PARTNER_TYPES
     })
 
+def build_replayed_assessment(assessment: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild the assess-partner response for a stored assessment"""
+    return {
+        'assessment_id': assessment['id'],
+        'partner_type': assessment['partner_type'],
+        'partner_name': assessment['partner_name'],
+        'partner_key': assessment['partner_key'],
+        'nova_score': assessment['nova_score'],
+        'risk_category': assessment['risk_category'],
+        'loan_decision': MLNovaScoreCalculator.make_loan_decision(
+            assessment['nova_score'],
+            assessment['monthly_earning'],
+            assessment['working_tenure_ingrab']
+        ),
+        'recommendations': json.loads(assessment['recommendations'] or '[]'),
+        'model_used': ml_loader.model_info['best_model_name'],
+        'timestamp': assessment['created_at'],
+        'idempotent_replay': True
+    }
+
 @app.route("/api/assess-partner", methods=['POST'])
 def assess_partner():
     """Assess a single partner using ML model"""
@@ -635,9 +3898,33 @@ def assess_partner():
         # Add partner type to data for feature engineering
         partner_data['partner_type'] = partner_type
         
+        # Stable partner identity, part of the payload so different partners never deduplicate together
+        partner_key = normalize_partner_key(data.get('partner_key', partner_data.get('partner_key')))
+        if partner_key:
+            partner_data['partner_key'] = partner_key
+        
+        # Retries and resubmissions return the existing assessment instead of re-scoring
+        idempotency_key = request.headers.get('Idempotency-Key')
+        content_hash = compute_content_hash(partner_data)
+        payload_hash = compute_content_hash(partner_data, versioned=False)
+        existing = find_recent_assessment(idempotency_key=idempotency_key) if idempotency_key else None
+        if existing and not is_same_payload(existing, content_hash, payload_hash):
+            return jsonify({'error': 'Idempotency key conflict',
+                            'message': 'Idempotency-Key was already used with a different payload'}), 409
+        existing = existing or find_recent_assessment(content_hash=content_hash)
+        if existing:
+            response = jsonify(build_replayed_assessment(existing))
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+        
         # Calculate Nova Score using ML model
         calculator = MLNovaScoreCalculator()
-        nova_score = calculator.predict_nova_score(partner_type, partner_data)
+        feature_vector = FeatureEngineer.prepare_features_for_prediction(
+            partner_data, ml_loader.model_info['feature_names']
+        )
+        nova_score = calculator.predict_nova_score(partner_type, partner_data, feature_vector)
+        provided_mask = FeatureStore.provided_mask(partner_data)
+        drift_monitor.observe_vector(feature_vector, provided_mask, partner_type, nova_score)
         
         # Get risk category
         risk_category = calculator.get_risk_category(nova_score)
@@ -649,13 +3936,17 @@ def assess_partner():
             partner_data.get('working_tenure_ingrab', 0)
         )
         
-        # Get recommendations
-        recommendations = calculator.get_recommendations(nova_score, partner_data)
+        # Get recommendations; an unavailable LLM degrades to none rather than failing scoring
+        try:
+            recommendations = calculator.get_recommendations(nova_score, partner_data)
+        except LLMUnavailableError:
+            recommendations = []
         
         # Save to database
         assessment_data = {
             'partner_type': partner_type,
             'partner_name': partner_data.get('partner_name', 'Partner'),
+            'partner_key': partner_key,
             'monthly_earning': partner_data.get('monthly_earning', 0),
             'yearly_earning': partner_data.get('yearly_earning', 0),
             'customer_rating': partner_data.get('customer_rating', 0),
@@ -666,7 +3957,13 @@ def assess_partner():
             'loan_amount': loan_decision.get('max_amount', 0),
             'interest_rate': loan_decision.get('interest_rate', 0),
             'risk_category': risk_category,
-            'additional_data': partner_data
+            'additional_data': partner_data,
+            'features': feature_vector[0],
+            'provided_mask': provided_mask,
+            'content_hash': content_hash,
+            'payload_hash': payload_hash,
+            'idempotency_key': idempotency_key,
+            'recommendations': recommendations
         }
         
         assessment_id = save_assessment(assessment_data)
@@ -675,6 +3972,7 @@ def assess_partner():
             'assessment_id': assessment_id,
             'partner_type': partner_type,
             'partner_name': partner_data.get('partner_name', 'Partner'),
+            'partner_key': partner_key,
             'nova_score': nova_score,
             'risk_category': risk_category,
             'loan_decision': loan_decision,
@@ -686,13 +3984,23 @@ def assess_partner():
     except ValueError as e:
         logger.error(f"Validation error: {str(e)}")
         return jsonify({'error': 'Validation error', 'message': str(e)}), 400
+    except WriteBehindFullError as e:
+        logger.warning(f"Assessment rejected: {str(e)}")
+        response = jsonify({'error': 'Service busy', 'message': str(e)})
+        response.headers['Retry-After'] = '1'
+        return response, 503
     except Exception as e:
         logger.error(f"Assessment error: {str(e)}")
         return jsonify({'error': 'Assessment failed', 'message': str(e)}), 500
 
+# Columns of a batch result download
+BATCH_RESULT_COLUMNS = [
+    'assessment_id', 'partner_name', 'nova_score', 'risk_category', 'loan_approved', 'loan_amount', 'duplicate'
+]
+
 @app.route("/api/batch-assess", methods=['POST'])
 def batch_assess():
-    """Batch assess multiple partners from CSV using ML model"""
+    """Batch assess multiple partners from a CSV, Parquet, Arrow IPC or NDJSON file using ML model"""
     try:
         if 'file' not in request.files:
             return jsonify({'error': 'No file provided'}), 400
@@ -701,76 +4009,119 @@ def batch_assess():
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
         
-        if not file.filename.endswith('.csv'):
-            return jsonify({'error': 'File must be a CSV'}), 400
+        input_format = BatchFileFormat.detect(file.filename, file.mimetype)
+        if input_format is None:
+            return jsonify({'error': 'File must be a CSV, Parquet, Arrow IPC or NDJSON file'}), 400
         
-        # Read CSV file
-        stream = io.StringIO(file.stream.read().decode("UTF8"), newline=None)
-        df = pd.read_csv(stream)
+        # Results come back as JSON unless a download format is requested
+        output_format = request.args.get('output')
+        try:
+            BatchFileFormat.require(input_format)
+            if output_format:
+                BatchFileFormat.require(output_format)
+        except UnsupportedFormatError as e:
+            return jsonify({'error': 'Unsupported format', 'message': str(e)}), 415
+        
+        df = BatchFileFormat.read(file.stream, input_format)
         
         results = []
         calculator = MLNovaScoreCalculator()
         
-        for _, row in df.iterrows():
-            try:
-                data = row.to_dict()
-                partner_type = data.get('partner_type', 'driver')
-                
-                # Skip rows with missing essential data
-                if pd.isna(data.get('monthly_earning')) or pd.isna(data.get('customer_rating')):
-                    continue
-                
-                # Add partner type to data
-                data['partner_type'] = partner_type
-                
-                # Calculate assessment using ML model
-                nova_score = calculator.predict_nova_score(partner_type, data)
-                risk_category = calculator.get_risk_category(nova_score)
-                loan_decision = calculator.make_loan_decision(
-                    nova_score,
-                    data.get('monthly_earning', 0),
-                    data.get('working_tenure_ingrab', 0)
-                )
-                
-                # Save to database
-                assessment_data = {
-                    'partner_type': partner_type,
-                    'partner_name': data.get('partner_name', f'Partner_{len(results)+1}'),
+        # Validate all rows column-wise and skip the ones that fail
+        validation = validate_partner_frame(df)
+        scored = df[validation['valid']].reset_index(drop=True)
+        if 'partner_type' not in scored.columns:
+            scored['partner_type'] = 'driver'
+        if 'partner_key' in scored.columns:
+            # Same canonical key, and so the same content hash, as /api/assess-partner
+            scored['partner_key'] = scored['partner_key'].map(normalize_partner_key).astype(object)
+        
+        # Rows already assessed inside the idempotency window, or repeated within this
+        # file, are skipped and answered with the existing assessment
+        records = scored.to_dict('records')
+        content_hashes = batch_executor.content_hashes(scored)
+        existing = find_recent_assessments_by_hash(content_hashes)
+        hash_series = pd.Series(content_hashes, dtype=object)
+        duplicate = (hash_series.isin(list(existing)) | hash_series.duplicated()).to_numpy()
+        fresh = np.flatnonzero(~duplicate)
+        
+        if len(fresh):
+            # Score and price the new rows column-wise, sharded across workers for large files
+            to_score = scored.iloc[fresh].reset_index(drop=True)
+            scores = batch_executor.score(to_score)
+            drift_monitor.observe_matrix(scores['features'], scores['provided_mask'],
+                                         to_score['partner_type'].to_numpy(), scores['nova_score'])
+            risk_categories = calculator.get_risk_categories(scores['nova_score'])
+            
+            assessments = []
+            for j, i in enumerate(fresh.tolist()):
+                data = records[i]
+                assessments.append({
+                    'partner_type': data['partner_type'],
+                    'partner_name': data.get('partner_name', f'Partner_{i+1}'),
+                    'partner_key': data.get('partner_key'),
                     'monthly_earning': data.get('monthly_earning', 0),
                     'yearly_earning': data.get('yearly_earning', 0),
                     'customer_rating': data.get('customer_rating', 0),
                     'active_days': data.get('active_days', 0),
                     'working_tenure_ingrab': data.get('working_tenure_ingrab', 0),
-                    'nova_score': nova_score,
-                    'loan_approved': loan_decision['approved'],
-                    'loan_amount': loan_decision.get('max_amount', 0),
-                    'interest_rate': loan_decision.get('interest_rate', 0),
-                    'risk_category': risk_category,
-                    'additional_data': data
-                }
-                
-                assessment_id = save_assessment(assessment_data)
-                
-                results.append({
+                    'nova_score': float(scores['nova_score'][j]),
+                    'loan_approved': bool(scores['approved'][j]),
+                    'loan_amount': int(scores['max_amount'][j]),
+                    'interest_rate': float(scores['interest_rate'][j]),
+                    'risk_category': str(risk_categories[j]),
+                    'additional_data': data,
+                    'features': scores['features'][j],
+                    'provided_mask': scores['provided_mask'][j],
+                    'content_hash': content_hashes[i]
+                })
+            
+            # Save to database in a single transaction
+            assessment_ids = save_assessments_bulk(assessments)
+            
+            for assessment_id, assessment in zip(assessment_ids, assessments):
+                existing.setdefault(assessment['content_hash'], {
                     'assessment_id': assessment_id,
-                    'partner_name': data.get('partner_name', f'Partner_{len(results)+1}'),
-                    'nova_score': nova_score,
-                    'risk_category': risk_category,
-                    'loan_approved': loan_decision['approved'],
-                    'loan_amount': loan_decision.get('max_amount', 0)
+                    'partner_name': assessment['partner_name'],
+                    'nova_score': assessment['nova_score'],
+                    'risk_category': assessment['risk_category'],
+                    'loan_approved': assessment['loan_approved'],
+                    'loan_amount': assessment['loan_amount']
                 })
-                
-            except Exception as e:
-                logger.error(f"Row processing error: {str(e)}")
-                continue
         
-        return jsonify({
+        # Results in input order
+        for i, content_hash in enumerate(content_hashes):
+            result = dict(existing[content_hash])
+            if duplicate[i]:
+                result['duplicate'] = True
+            results.append(result)
+        
+        if output_format:
+            table = pd.DataFrame(results, columns=BATCH_RESULT_COLUMNS)
+            table['duplicate'] = table['duplicate'].fillna(False).astype(bool)
+            response = send_file(
+                BatchFileFormat.write(table, output_format),
+                mimetype=BatchFileFormat.MIMETYPES[output_format],
+                as_attachment=True,
+                download_name=f'batch_assessment_results.{output_format}'
+            )
+            response.headers['X-Total-Rows'] = str(len(df))
+            response.headers['X-Total-New'] = str(len(fresh))
+            response.headers['X-Total-Duplicates'] = str(int(duplicate.sum()))
+            response.headers['X-Total-Invalid'] = str(len(validation['errors']))
+            return response
+        
+        return tabular_response({
             'message': f'Processed {len(results)} assessments successfully using ML model',
             'results': results,
             'total_processed': len(results),
+            'total_new': int(len(fresh)),
+            'total_duplicates': int(duplicate.sum()),
             'total_rows': len(df),
+            'total_invalid': len(validation['errors']),
+            'errors': validation['errors'],
             'model_used': ml_loader.model_info['best_model_name']
-        })
+        }, 'results')
         
     except Exception as e:
         logger.error(f"Batch assessment error: {str(e)}")
@@ -846,14 +4197,112 @@ def get_history():
     try:
         limit = request.args.get('limit', 100, type=int)
         history = get_assessment_history(limit)
-        return jsonify({
+        return tabular_response({
             'assessments': history,
             'total': len(history)
-        })
+        }, 'assessments')
     except Exception as e:
         logger.error(f"History retrieval error: {str(e)}")
         return jsonify({'error': 'Failed to retrieve history', 'message': str(e)}), 500
 
+@app.route("/api/assessments/export", methods=['GET'])
+def export_assessments():
+    """Stream assessment history as CSV or Parquet"""
+    try:
+        fmt = request.args.get('format', 'csv')
+        if fmt not in AssessmentExporter.MIMETYPES:
+            return jsonify({'error': 'Unsupported format', 'message': 'Use csv or parquet'}), 400
+        if fmt == 'parquet' and pa is None:
+            return jsonify({'error': 'Unsupported format', 'message': 'Parquet export requires pyarrow to be installed'}), 415
+        
+        try:
+            exporter = AssessmentExporter(
+                fmt,
+                partner_type=request.args.get('partner_type'),
+                since=request.args.get('since'),
+                until=request.args.get('until'),
+                resume_token=request.args.get('resume_token'),
+                limit=request.args.get('limit', type=int),
+                compress=request.args.get('compression') == 'gzip'
+            )
+        except ValueError as e:
+            return jsonify({'error': 'Invalid resume token', 'message': str(e)}), 400
+        resume_token = exporter.open()
+        
+        mimetype = 'application/gzip' if fmt == 'csv' and exporter.compress else AssessmentExporter.MIMETYPES[fmt]
+        response = Response(stream_with_context(exporter.stream()), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename={exporter.filename()}'
+        if resume_token:
+            response.headers['X-Resume-Token'] = resume_token
+        return response
+    except Exception as e:
+        logger.error(f"Export error: {str(e)}")
+        return jsonify({'error': 'Failed to export assessments', 'message': str(e)}), 500
+
+@app.route("/api/monitoring/drift", methods=['GET'])
+def get_drift_report():
+    """Get feature and score drift of recent traffic against the stored baseline"""
+    try:
+        return jsonify(drift_monitor.report(request.args.get('since')))
+    except Exception as e:
+        logger.error(f"Drift report error: {str(e)}")
+        return jsonify({'error': 'Failed to build drift report', 'message': str(e)}), 500
+
+@app.route("/api/monitoring/baseline", methods=['POST'])
+def create_drift_baseline():
+    """Build a drift baseline from stored assessments (optionally limited to a date range)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        baseline = DriftMonitor.build_baseline(data.get('since'), data.get('until'))
+        if not baseline.vectors:
+            return jsonify({'error': 'No data', 'message': 'No stored assessments in the requested range'}), 400
+        DriftMonitor.save(baseline, 'baseline')
+        return jsonify({'message': 'Baseline created', 'vectors': baseline.vectors})
+    except Exception as e:
+        logger.error(f"Baseline creation error: {str(e)}")
+        return jsonify({'error': 'Failed to create baseline', 'message': str(e)}), 500
+
+@app.route("/api/assessments/<assessment_id>/features", methods=['GET'])
+def get_stored_features(assessment_id):
+    """Get the stored model feature vector of an assessment"""
+    try:
+        stored = FeatureStore.get_features(assessment_id)
+        if stored is None:
+            return jsonify({'error': 'Not found', 'message': 'No stored features for this assessment'}), 404
+        return jsonify({'assessment_id': assessment_id, **stored})
+    except Exception as e:
+        logger.error(f"Feature retrieval error: {str(e)}")
+        return jsonify({'error': 'Failed to retrieve features', 'message': str(e)}), 500
+
+@app.route("/api/partners/<partner_key>/latest", methods=['GET'])
+def get_partner_latest_score(partner_key):
+    """Get the latest score and loan decision of a partner"""
+    try:
+        latest = get_partner_latest(partner_key)
+        if latest is None:
+            return jsonify({'error': 'Not found', 'message': 'No assessments for this partner'}), 404
+        return jsonify(latest)
+    except Exception as e:
+        logger.error(f"Partner lookup error: {str(e)}")
+        return jsonify({'error': 'Failed to retrieve partner score', 'message': str(e)}), 500
+
+@app.route("/api/partners/<partner_key>/timeline", methods=['GET'])
+def get_partner_score_timeline(partner_key):
+    """Get the score and loan history of a partner, newest first"""
+    try:
+        limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+        timeline = get_partner_timeline(partner_key, request.args.get('since'),
+                                         request.args.get('until'), limit)
+        return tabular_response({
+            'partner_key': partner_key,
+            'latest': get_partner_latest(partner_key),
+            'timeline': timeline,
+            'total': len(timeline)
+        }, 'timeline')
+    except Exception as e:
+        logger.error(f"Partner timeline error: {str(e)}")
+        return jsonify({'error': 'Failed to retrieve partner timeline', 'message': str(e)}), 500
+
 @app.route("/api/dashboard-stats", methods=['GET'])
 def get_stats():
     """Get dashboard statistics"""
@@ -890,7 +4339,11 @@ def predict_score_only():
         
         # Calculate Nova Score using ML model
         calculator = MLNovaScoreCalculator()
-        nova_score = calculator.predict_nova_score(partner_type, partner_data)
+        feature_vector = FeatureEngineer.prepare_features_for_prediction(
+            partner_data, ml_loader.model_info['feature_names']
+        )
+        nova_score = calculator.predict_nova_score(partner_type, partner_data, feature_vector)
+        drift_monitor.observe_vector(feature_vector, FeatureStore.provided_mask(partner_data), partner_type, nova_score)
         
         # Get risk category
         risk_category = calculator.get_risk_category(nova_score)
@@ -910,6 +4363,97 @@ def predict_score_only():
         logger.error(f"Prediction error: {str(e)}")
         return jsonify({'error': 'Prediction failed', 'message': str(e)}), 500
 
+@app.route("/api/what-if", methods=['POST'])
+def what_if_analysis():
+    """Score a grid or list of perturbations around a base partner in one batched prediction"""
+    try:
+        data = request.get_json()
+
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        partner_type = data.get('partner_type')
+        partner_data = data.get('partner_data', {})
+        grid = data.get('grid')
+        perturbations = data.get('perturbations')
+
+        if not partner_type:
+            return jsonify({'error': 'Partner type is required'}), 400
+
+        if not validate_partner_type(partner_type):
+            return jsonify({'error': 'Invalid partner type. Must be driver, merchant, or delivery_partner'}), 400
+
+        if bool(grid) == bool(perturbations):
+            return jsonify({'error': 'Provide exactly one of grid or perturbations'}), 400
+
+        if grid is not None and not isinstance(grid, dict):
+            return jsonify({'error': 'Grid must be an object mapping fields to values'}), 400
+
+        if perturbations is not None and not isinstance(perturbations, list):
+            return jsonify({'error': 'Perturbations must be a list of field overrides'}), 400
+
+        if not isinstance(partner_data, dict):
+            return jsonify({'error': 'Partner data must be an object of field values'}), 400
+
+        # Validate base partner data
+        validate_partner_data(partner_type, partner_data)
+
+        scenarios, axes = WhatIfAnalyzer.build_scenarios(partner_type, partner_data, grid, perturbations)
+
+        # Score base and all scenarios with a single model call
+        calculator = MLNovaScoreCalculator()
+        nova_scores = calculator.predict_nova_scores(scenarios, missing_as_default=True)
+        risk_categories = calculator.get_risk_categories(nova_scores)
+
+        changed_fields = list(axes) if grid else sorted({field for p in perturbations for field in p})
+        scenario_values = [
+            {k: v for k, v in values.items() if not pd.isna(v)}
+            for values in scenarios.reindex(columns=changed_fields + ['monthly_earning', 'working_tenure_ingrab']).to_dict('records')
+        ]
+        loan_decisions = LoanDecisionEngine.to_dicts(LoanDecisionEngine.decide_batch(
+            nova_scores,
+            [values.get('monthly_earning', 0) for values in scenario_values],
+            [values.get('working_tenure_ingrab', 0) for values in scenario_values]
+        ))
+
+        points = []
+        for i in range(1, len(scenarios)):
+            points.append({
+                'values': {field: scenario_values[i][field] for field in changed_fields if field in scenario_values[i]},
+                'nova_score': float(nova_scores[i]),
+                'risk_category': str(risk_categories[i]),
+                'loan_decision': loan_decisions[i]
+            })
+
+        response = {
+            'partner_type': partner_type,
+            'base': {
+                'nova_score': float(nova_scores[0]),
+                'risk_category': str(risk_categories[0]),
+                'loan_decision': loan_decisions[0]
+            },
+            'points': points,
+            'band_crossings': WhatIfAnalyzer.minimal_band_crossings(scenarios, nova_scores, changed_fields),
+            'total_points': len(points),
+            'model_used': ml_loader.model_info['best_model_name'],
+            'timestamp': datetime.now().isoformat()
+        }
+        if grid:
+            response['surface'] = {
+                # Ordered like the nova_scores dimensions (a dict would be key-sorted by jsonify)
+                'axes': [{'field': field, 'values': values} for field, values in axes.items()],
+                'nova_scores': nova_scores[1:].reshape([len(values) for values in axes.values()]).tolist()
+            }
+
+        return jsonify(response)
+
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return jsonify({'error': 'Validation error', 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"What-if analysis error: {str(e)}")
+        return jsonify({'error': 'What-if analysis failed', 'message': str(e)}), 500
+
 @app.route("/api/health", methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -937,7 +4481,9 @@ def health_check():
             "version": "2.0.0",
             "model_status": "operational",
             "model_name": ml_loader.model_info['best_model_name'],
-            "test_prediction": test_score
+            "test_prediction": test_score,
+            "llm_circuit_state": llm_client.breaker.state,
+            "write_behind": write_behind.get_status()
         })
     except Exception as e:
         logger.error(f"Health check error: {str(e)}")
@@ -948,6 +4494,15 @@ def health_check():
             "error": str(e)
         }), 500
 
+@app.route("/api/llm-status", methods=['GET'])
+def get_llm_status():
+    """Get queue depth, concurrency and circuit breaker state of the LLM client"""
+    try:
+        return jsonify(llm_client.get_status())
+    except Exception as e:
+        logger.error(f"LLM status retrieval error: {str(e)}")
+        return jsonify({'error': 'Failed to retrieve LLM status', 'message': str(e)}), 500
+
 @app.route("/api/validate-features", methods=['POST'])
 def validate_features():
     """Validate if provided features are sufficient for prediction"""